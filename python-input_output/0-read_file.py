@@ -1,13 +1,73 @@
 #!/usr/bin/python3
 """Module for reading files."""
+import io
+import os
+import stat
+import sys
 
+BUFFER_SIZE = 1 << 17
 
-def read_file(filename=""):
+
+def read_file(filename="", zero_copy=False):
     """
     Read a text file (UTF8) and print it to stdout.
 
     Args:
         filename: The name of the file to read (default empty string).
+        zero_copy: If True, copy the raw bytes straight to stdout's file
+            descriptor instead of decoding and printing the text, using
+            os.sendfile when stdout is a file or pipe and a reused
+            buffer otherwise. Memory stays constant whatever the size.
     """
+    if zero_copy:
+        _copy_to_stdout(filename)
+        return
+
     with open(filename, encoding="utf-8") as f:
         print(f.read(), end="")
+
+
+def _copy_to_stdout(filename):
+    """Copy the bytes of a file to stdout without decoding them."""
+    try:
+        out = sys.stdout.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        with open(filename, encoding="utf-8") as f:
+            for chunk in iter(lambda: f.read(BUFFER_SIZE), ""):
+                sys.stdout.write(chunk)
+        return
+
+    sys.stdout.flush()
+    with open(filename, mode="rb", buffering=0) as f:
+        mode = os.fstat(out).st_mode
+        if stat.S_ISREG(mode) or stat.S_ISFIFO(mode):
+            try:
+                _sendfile(f.fileno(), out)
+                return
+            except OSError:
+                pass
+        _readinto(f, out)
+
+
+def _sendfile(src, out):
+    """
+    Copy everything from src to out with os.sendfile.
+
+    The position of src advances with each call, so a fallback after
+    an error resumes where sendfile stopped.
+    """
+    while os.sendfile(out, src, None, BUFFER_SIZE << 4):
+        pass
+
+
+def _readinto(f, out):
+    """Copy everything from f to out through one reused buffer."""
+    buf = bytearray(BUFFER_SIZE)
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        done = 0
+        while done < n:
+            done += os.write(out, view[done:n])
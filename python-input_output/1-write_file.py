@@ -1,17 +1,69 @@
 #!/usr/bin/python3
 """Module for writing to files."""
+import os
+import uuid
 
 
-def write_file(filename="", text=""):
+def write_file(filename="", text="", atomic=False, fsync=False):
     """
     Write a string to a text file (UTF8) and return characters written.
 
     Args:
         filename: The name of the file to write to.
         text: The text to write to the file.
+        atomic: If True, write to a temporary file next to filename and
+            rename it over filename, so readers and crashes only ever
+            see the old or the new content, never a partial write.
+        fsync: If True (atomic mode only), flush the data and the
+            rename to disk before returning.
 
     Returns:
         The number of characters written.
     """
+    if atomic:
+        return _write_atomic(filename, text, fsync)
+
     with open(filename, mode="w", encoding="utf-8") as f:
         return f.write(text)
+
+
+def _write_atomic(filename, text, fsync):
+    """
+    Write text to filename through a sibling temp file and a rename.
+
+    Symbolic links are resolved first so their target is replaced, and
+    the mode and, when allowed, the owner of an existing file are kept.
+    Other hard links to the old file keep pointing at the old content.
+    """
+    directory, name = os.path.split(os.path.realpath(filename))
+    filename = os.path.join(directory, name)
+    tmp = os.path.join(directory, ".{}.{}.tmp".format(name, uuid.uuid4().hex))
+    try:
+        with open(tmp, mode="x", encoding="utf-8") as f:
+            count = f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            st = os.stat(filename)
+        except FileNotFoundError:
+            pass
+        else:
+            os.chmod(tmp, st.st_mode)
+            try:
+                os.chown(tmp, st.st_uid, st.st_gid)
+            except PermissionError:
+                pass
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    if fsync:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return count
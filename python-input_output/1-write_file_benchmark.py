@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+"""
+1-write_file_benchmark
+
+Compare throughput and tail latency of the plain and atomic modes of
+write_file when writing many small files.
+
+Usage: ./1-write_file_benchmark.py [number_of_files] [directory]
+"""
+import os
+import sys
+import tempfile
+import time
+
+write_file = __import__('1-write_file').write_file
+
+
+def bench(label, directory, n, **kwargs):
+    """Write n small files and print files/s and latency percentiles."""
+    text = "Holberton School is so cool!\n" * 8
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        path = os.path.join(directory, "file_{}.txt".format(i % 100))
+        t = time.perf_counter()
+        write_file(path, text, **kwargs)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print("{:<14} {:10.0f} files/s  p50 {:8.1f}us  p99 {:8.1f}us  "
+          "max {:8.1f}us".format(
+              label, n / elapsed,
+              latencies[n // 2] * 1e6,
+              latencies[min(n - 1, n * 99 // 100)] * 1e6,
+              latencies[-1] * 1e6))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory(
+            dir=sys.argv[2] if len(sys.argv) > 2 else None) as tmp:
+        bench("plain", tmp, n)
+        bench("atomic", tmp, n, atomic=True)
+        bench("atomic+fsync", tmp, max(1, n // 10), atomic=True, fsync=True)
@@ -1,21 +1,177 @@
 #!/usr/bin/python3
 """Module for inserting text after specific lines in a file."""
+import os
+import re
+import shutil
+import tempfile
+from collections import deque
+
+BUFFER_SIZE = 1 << 16
+PREFILTER_MAX = 32
 
 
 def append_after(filename="", search_string="", new_string=""):
     """
     Insert a line of text after each line containing a specific string.
 
+    The file is streamed line by line through buffers of BUFFER_SIZE
+    bytes into a temporary file in the same directory, which then
+    atomically replaces the original. Memory stays bounded by the
+    buffers and the longest line, and an interrupted run leaves the
+    original file untouched.
+
     Args:
         filename: The name of the file to modify.
         search_string: The string to search for in each line.
         new_string: The string to insert after matching lines.
     """
-    with open(filename, mode="r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    with open(filename, mode="w", encoding="utf-8") as f:
-        for line in lines:
-            f.write(line)
-            if search_string in line:
-                f.write(new_string)
+    def insertion(line):
+        return new_string if search_string in line else ""
+
+    _rewrite(filename, insertion)
+
+
+def append_after_many(filename="", insertions=None):
+    """
+    Insert text after matching lines for many search strings at once.
+
+    All search strings are matched in a single pass by an Aho-Corasick
+    automaton, whose cost per line does not depend on their number. Up
+    to PREFILTER_MAX search strings, a compiled regular expression
+    alternation first rejects lines containing none of them at C
+    speed, and the automaton only scans from its match on. The file
+    is rewritten once whatever the number of search strings. After
+    each line, the text of every search string it contains is
+    inserted, in the order of insertions.
+
+    Args:
+        filename: The name of the file to modify.
+        insertions: Mapping of search strings to the text to insert
+            after lines containing them.
+    """
+    insertions = dict(insertions or {})
+    texts = list(insertions.values())
+    automaton = Automaton(insertions.keys())
+
+    def insertion(line):
+        return "".join(texts[i] for i in automaton.matches(line))
+
+    _rewrite(filename, insertion)
+
+
+def _rewrite(filename, insertion):
+    """
+    Stream a file into a temporary copy, then atomically replace it.
+
+    Symbolic links are resolved first, so the file they point to is
+    the one replaced, and the copy gets the mode and, when allowed,
+    the owner of the original. A file with several hard links cannot
+    be replaced without breaking them: its copy is written back over
+    it in place instead, which keeps the links but is not atomic.
+
+    Args:
+        filename: The name of the file to modify.
+        insertion: Function returning the text to write after a line.
+    """
+    filename = os.path.realpath(filename)
+    st = os.stat(filename)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename),
+                               prefix=".append_after.")
+    try:
+        with open(filename, mode="r", encoding="utf-8",
+                  buffering=BUFFER_SIZE) as src, \
+                open(fd, mode="w", encoding="utf-8",
+                     buffering=BUFFER_SIZE) as dst:
+            for line in src:
+                dst.write(line)
+                text = insertion(line)
+                if text:
+                    dst.write(text)
+        if st.st_nlink > 1:
+            with open(tmp, mode="rb") as src, \
+                    open(filename, mode="wb") as dst:
+                shutil.copyfileobj(src, dst, BUFFER_SIZE)
+            os.unlink(tmp)
+            return
+        os.chmod(tmp, st.st_mode)
+        try:
+            os.chown(tmp, st.st_uid, st.st_gid)
+        except PermissionError:
+            pass
+        os.replace(tmp, filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Automaton:
+    """Aho-Corasick automaton matching many strings in one scan."""
+
+    def __init__(self, patterns):
+        """
+        Build the automaton.
+
+        Args:
+            patterns: Iterable of strings, identified by their position.
+        """
+        patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.always = []
+        for index, pattern in enumerate(patterns):
+            if not pattern:
+                self.always.append(index)
+                continue
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.out[state].append(index)
+
+        # Any match starts at or after the leftmost one of the regular
+        # expression, so lines without it need no scan at all. The
+        # alternation is tried branch by branch, so it only pays off
+        # for a few patterns.
+        words = sorted({p for p in patterns if p}, key=len, reverse=True)
+        self.prefilter = None
+        if 0 < len(words) <= PREFILTER_MAX:
+            self.prefilter = re.compile("|".join(map(re.escape, words)))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def matches(self, text):
+        """
+        Return the indexes of the patterns found in text, sorted.
+
+        Args:
+            text: The string to scan.
+        """
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set(self.always)
+        if self.prefilter:
+            first = self.prefilter.search(text)
+            if first is None:
+                return sorted(found)
+            text = text[first.start():]
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return sorted(found)
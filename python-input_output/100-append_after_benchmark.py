@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""
+100-append_after_benchmark
+
+Compare time and peak Python memory of the streaming append_after with
+the former readlines() implementation on a generated file, then the
+time of append_after_many with a per-line scan of every search string
+and with one append_after pass per search string, for search strings
+sharing a prefix and for 150 random ones sharing none.
+
+Usage: ./100-append_after_benchmark.py [size_in_MB] [number_of_patterns]
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+module = __import__('100-append_after')
+append_after = module.append_after
+append_after_many = module.append_after_many
+
+
+def append_after_readlines(filename="", search_string="", new_string=""):
+    """Former implementation: read every line, then rewrite in place."""
+    with open(filename, mode="r", encoding="utf-8") as f:
+        lines = f.readlines()
+
+    with open(filename, mode="w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line)
+            if search_string in line:
+                f.write(new_string)
+
+
+def append_after_scan(filename="", insertions=None):
+    """Single pass testing every search string with `in` on each line."""
+    items = list(insertions.items())
+
+    def insertion(line):
+        return "".join(text for search, text in items if search in line)
+
+    module._rewrite(filename, insertion)
+
+
+def append_after_passes(filename="", insertions=None):
+    """One append_after pass over the file per search string."""
+    for search, text in insertions.items():
+        append_after(filename, search, text)
+
+
+def make_file(path, size):
+    """Write about size bytes of text lines, one in ten matching."""
+    line = "Python is cool, and so is this line number {:09d}\n"
+    with open(path, mode="w", encoding="utf-8") as f:
+        written = i = 0
+        while written < size:
+            text = line.format(i)
+            if i % 10 == 0:
+                text = "School " + text
+            written += f.write(text)
+            i += 1
+
+
+def bench(label, func, path):
+    """Run func on path and print elapsed time and peak memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(path, "School", "\"C is fun!\"\n")
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("{:<10} {:8.2f}s  peak {:10.1f} MB".format(
+        label, elapsed, peak / 1e6))
+
+
+def make_patterns_file(path, size, patterns, rng):
+    """Write about size bytes of 80-character lines, few matching."""
+    with open(path, mode="w", encoding="utf-8") as f:
+        written = 0
+        while written < size:
+            words = ["w{:05d}".format(rng.randrange(100000))
+                     for _ in range(13)]
+            if rng.random() < 0.02:
+                words[rng.randrange(13)] = rng.choice(patterns)
+            written += f.write(" ".join(words)[:79] + "\n")
+
+
+def bench_many(label, func, path, insertions):
+    """Run func on path with insertions and print elapsed time."""
+    start = time.perf_counter()
+    func(path, insertions)
+    print("{:<10} {:8.2f}s".format(label, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    size = int(float(sys.argv[1] if len(sys.argv) > 1 else 100) * 1e6)
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.txt")
+        for label, func in (("readlines", append_after_readlines),
+                            ("streaming", append_after)):
+            make_file(path, size)
+            bench(label, func, path)
+
+        rng = random.Random(0)
+        cases = (("ERR", ["ERR{:03d}".format(i) for i in range(count)]),
+                 ("random", ["".join(rng.choice(string.ascii_lowercase)
+                                     for _ in range(6))
+                             for _ in range(150)]))
+        for name, patterns in cases:
+            print("{} {} search strings:".format(len(patterns), name))
+            insertions = {p: "# after {}\n".format(p) for p in patterns}
+            results = []
+            for label, func in (("passes", append_after_passes),
+                                ("scan", append_after_scan),
+                                ("many", append_after_many)):
+                make_patterns_file(path, size, patterns, random.Random(0))
+                bench_many(label, func, path, insertions)
+                with open(path, encoding="utf-8") as f:
+                    results.append(f.read())
+            assert results[1] == results[2]
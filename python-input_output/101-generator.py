@@ -1,15 +1,174 @@
 #!/usr/bin/python3
+"""
+Generate random log lines for 101-stats.py.
+
+Without options, 10000 lines are written at a random pace, as the
+original checker does. With any of the load options, lines are
+generated deterministically (seeded, with timestamps derived from the
+line number) and written in large batches, either at a target rate or
+as fast as possible, e.g.:
+
+    ./101-generator.py --seed 1 --lines 1000000 --output corpus.log
+    ./101-generator.py --seed 1 --rate 50000 | ./101-stats.py --binary
+"""
+import argparse
+import bisect
+import datetime
+import itertools
 import random
 import sys
+import time
 from time import sleep
-import datetime
 
-for i in range(10000):
-    sleep(random.random())
-    sys.stdout.write("{:d}.{:d}.{:d}.{:d} - [{}] \"GET /projects/260 HTTP/1.1\" {} {}\n".format(
-        random.randint(1, 255), random.randint(1, 255), random.randint(1, 255), random.randint(1, 255),
-        datetime.datetime.now(),
-        random.choice([200, 301, 400, 401, 403, 404, 405, 500]),
-        random.randint(1, 1024)
-    ))
-    sys.stdout.flush()
+STATUS_CODES = (200, 301, 400, 401, 403, 404, 405, 500)
+LINE = "{}.{}.{}.{} - [{}] \"GET /projects/260 HTTP/1.1\" {} {}\n"
+START = datetime.datetime(2017, 2, 5, 23, 31, 22)
+BATCH = 1 << 13
+
+
+def legacy():
+    """Write 10000 random lines, one at a time with random pauses."""
+    for i in range(10000):
+        sleep(random.random())
+        sys.stdout.write(LINE.format(
+            random.randint(1, 255), random.randint(1, 255),
+            random.randint(1, 255), random.randint(1, 255),
+            datetime.datetime.now(), random.choice(STATUS_CODES),
+            random.randint(1, 1024)))
+        sys.stdout.flush()
+
+
+def parse_codes(spec):
+    """
+    Parse a status code distribution such as "200:80,404:15,500:5".
+
+    Returns:
+        Tuple (codes, weights). A code without ":weight" weighs 1.
+
+    Raises:
+        ValueError: If spec is malformed.
+    """
+    codes, weights = [], []
+    for item in spec.split(","):
+        code, _, weight = item.partition(":")
+        codes.append(int(code))
+        weights.append(float(weight) if weight else 1.0)
+    if min(weights) < 0 or sum(weights) <= 0:
+        raise ValueError("weights must be non-negative, with a positive "
+                         "sum")
+    return codes, weights
+
+
+def size_sampler(spec, rng):
+    """
+    Return a function drawing response sizes from a distribution.
+
+    Args:
+        spec: "uniform:LOW:HIGH" or "lognormal:MU:SIGMA".
+        rng: The random.Random instance to draw from.
+
+    Raises:
+        ValueError: If spec is malformed.
+    """
+    kind, a, b = spec.split(":")
+    if kind == "uniform":
+        low, high = int(a), int(b)
+        if low > high:
+            raise ValueError("uniform sizes need LOW <= HIGH")
+        return lambda: rng.randint(low, high)
+    if kind == "lognormal":
+        mu, sigma = float(a), float(b)
+        return lambda: int(rng.lognormvariate(mu, sigma))
+    raise ValueError("unknown size distribution: {}".format(kind))
+
+
+def generate(out, lines, rate=0, seed=None, codes=STATUS_CODES,
+             weights=None, sizes="uniform:1:1024", batch=BATCH):
+    """
+    Write deterministic log lines in large batches.
+
+    Every random value of a line is drawn while the line is built, so
+    the corpus only depends on the seed and the distributions: lines
+    and batch change where it stops and how it is written, not what
+    it contains.
+
+    Args:
+        out: Text file object to write to.
+        lines: Number of lines to write (0 for no limit).
+        rate: Target lines per second (0 for as fast as possible).
+        seed: Seed of the random generator.
+        codes: Status codes to draw from.
+        weights: Relative weights of the codes (default: uniform).
+        sizes: Size distribution, as accepted by size_sampler.
+        batch: Number of lines per write.
+    """
+    rng = random.Random(seed)
+    size = size_sampler(sizes, rng)
+    cum_weights = list(itertools.accumulate(weights or [1] * len(codes)))
+    total, last = cum_weights[-1], len(cum_weights) - 1
+    step = datetime.timedelta(seconds=1 / rate if rate else 0.001)
+    started = time.monotonic()
+    written = 0
+    while not lines or written < lines:
+        count = batch if not lines else min(batch, lines - written)
+        chunk = []
+        for i in range(count):
+            chunk.append(LINE.format(
+                rng.randint(1, 255), rng.randint(1, 255),
+                rng.randint(1, 255), rng.randint(1, 255),
+                START + (written + i) * step,
+                codes[bisect.bisect(cum_weights, rng.random() * total,
+                                    0, last)],
+                size()))
+        out.write("".join(chunk))
+        written += count
+        if rate:
+            delay = written / rate - (time.monotonic() - started)
+            if delay > 0:
+                out.flush()
+                sleep(delay)
+    out.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate log lines.")
+    parser.add_argument("--lines", type=int,
+                        help="number of lines (default 10000, 0 for "
+                        "no limit)")
+    parser.add_argument("--rate", type=float,
+                        help="target lines per second (0 for as fast "
+                        "as possible)")
+    parser.add_argument("--seed", type=int, help="random seed")
+    parser.add_argument("--codes", metavar="CODE[:WEIGHT],...",
+                        help="status code distribution, e.g. "
+                        "200:80,404:15,500:5")
+    parser.add_argument("--sizes", metavar="DIST",
+                        help="size distribution, uniform:LOW:HIGH or "
+                        "lognormal:MU:SIGMA (default uniform:1:1024)")
+    parser.add_argument("--batch", type=int,
+                        help="lines per write (default {})".format(BATCH))
+    parser.add_argument("--output", metavar="PATH",
+                        help="write a corpus file instead of stdout")
+    args = parser.parse_args()
+
+    if all(value is None for value in vars(args).values()):
+        legacy()
+    else:
+        codes, weights = STATUS_CODES, None
+        try:
+            if args.codes:
+                codes, weights = parse_codes(args.codes)
+        except ValueError as error:
+            parser.error("bad --codes: {}".format(error))
+        try:
+            size_sampler(args.sizes or "uniform:1:1024", random.Random())
+        except ValueError as error:
+            parser.error("bad --sizes: {}".format(error))
+        lines = 10000 if args.lines is None else args.lines
+        out = open(args.output, "w") if args.output else sys.stdout
+        try:
+            generate(out, lines, args.rate or 0, args.seed, codes, weights,
+                     args.sizes or "uniform:1:1024", args.batch or BATCH)
+        finally:
+            if args.output:
+                out.close()
@@ -1,44 +1,1685 @@
 #!/usr/bin/python3
-"""Script that reads stdin line by line and computes metrics."""
+"""Script that reads stdin line by line and computes metrics.
+
+Usage:
+    ./101-stats.py                      read log lines from stdin
+    ./101-stats.py --binary             read stdin as bytes in large
+                                        chunks with the fast parser
+    ./101-stats.py --file access.log    memory-map a log file and parse
+                                        it in parallel shards
+    ./101-stats.py --every 1000         report every 1000 lines
+    ./101-stats.py --interval 5         report every 5 seconds
+    ./101-stats.py --percentiles        add p50/p90/p99 of response
+                                        sizes to the final report
+    ./101-stats.py --top-clients 10     add the 10 most frequent client
+                                        IPs, with guaranteed minimum
+                                        request counts, to the final
+                                        report
+    ./101-stats.py --windows 60,300     add counters over the last 60
+                                        and 300 seconds of log time
+    ./101-stats.py --file access.log --checkpoint access.ckpt
+                                        save progress periodically and
+                                        resume from it after a restart
+    ./101-stats.py --file access.log.gz read a gzip, bz2 or xz log,
+                                        decompressing in a thread
+    ./101-stats.py 'logs/*.gz' a.log    aggregate many files (paths or
+                                        globs) in a pool of workers
+    ./101-stats.py --format json        print each report as one JSON
+                                        line
+    ./101-stats.py --serve 9100         serve the latest counters in
+                                        Prometheus text format on
+                                        http://localhost:9100/metrics
+
+Compressed input is detected by its magic bytes, both for --file and
+for --binary stdin.
+"""
+import argparse
+import bz2
+import datetime
+import glob
+import gzip
+import heapq
+import json
+import lzma
+import math
+import mmap
+import os
+import queue
+import re
 import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import compress
+from multiprocessing import Pool
+from operator import not_
 
+STATUS_CODES = (200, 301, 400, 401, 403, 404, 405, 500)
+STATUS_LOOKUP = {str(code).encode(): code for code in STATUS_CODES}
+SHARD_SIZE = 1 << 26
+CHUNK_SIZE = 1 << 20
+PERCENTILES = (50, 90, 99)
+CLIENT_SLOTS = 20
+CODE_INDEX = {code: i for i, code in enumerate(STATUS_CODES)}
+WINDOWS = (60, 300, 900)
+WINDOW_RESOLUTION = 10
+CHECKPOINT_EVERY = 30
+COMPRESSED = ((b"\x1f\x8b", gzip.GzipFile),
+              (b"BZh", bz2.BZ2File),
+              (b"\xfd7zXZ\x00", lzma.LZMAFile))
+READ_AHEAD = 8
+PUBLISH_INTERVAL = 1.0
+# One match per line: the status code and size of a well-formed line,
+# or the whole line for parse_line_bytes to handle.
+BLOCK_LINE = re.compile(
+    rb"^(?:[^\n]* )?(" +
+    b"|".join(str(code).encode() for code in STATUS_CODES) +
+    rb") ([0-9]+)$|^([^\n]*)$", re.MULTILINE)
 
-def print_stats(total_size, status_counts):
-    """Print accumulated statistics."""
-    print("File size: {}".format(total_size))
+
+def format_stats(total_size, status_counts):
+    """Return the accumulated statistics as one block of text."""
+    lines = ["File size: {}\n".format(total_size)]
     for code in sorted(status_counts.keys()):
         if status_counts[code] > 0:
-            print("{}: {}".format(code, status_counts[code]))
+            lines.append("{}: {}\n".format(code, status_counts[code]))
+    return "".join(lines)
 
 
-if __name__ == "__main__":
-    total_size = 0
-    line_count = 0
-    status_counts = {
-        200: 0, 301: 0, 400: 0, 401: 0, 403: 0, 404: 0, 405: 0, 500: 0
-    }
-
-    try:
-        for line in sys.stdin:
-            line_count += 1
-            parts = line.split()
-            try:
-                file_size = int(parts[-1])
-                total_size += file_size
-            except (ValueError, IndexError):
-                pass
-            try:
-                status_code = int(parts[-2])
-                if status_code in status_counts:
-                    status_counts[status_code] += 1
-            except (ValueError, IndexError):
-                pass
-
-            if line_count % 10 == 0:
-                print_stats(total_size, status_counts)
+def print_stats(total_size, status_counts, flush=False):
+    """Print accumulated statistics in a single write."""
+    sys.stdout.write(format_stats(total_size, status_counts))
+    if flush:
+        sys.stdout.flush()
+
+
+def stats_dict(line_count, total_size, status_counts):
+    """Return the accumulated statistics as a JSON-ready dictionary."""
+    return {"lines": line_count, "file_size": total_size,
+            "status_codes": {str(code): count
+                             for code, count in sorted(status_counts.items())}}
+
+
+def new_status_counts():
+    """Return a zeroed status code counter."""
+    return {code: 0 for code in STATUS_CODES}
+
+
+def parse_line(line):
+    """
+    Parse the file size and status code of one log line.
+
+    Args:
+        line: The log line, as str or bytes.
+
+    Returns:
+        Tuple (file_size, status_code). file_size is None if the line
+        has none and status_code is None unless it is in STATUS_CODES.
+    """
+    parts = line.split()
+    file_size = None
+    status_code = None
+    try:
+        file_size = int(parts[-1])
+    except (ValueError, IndexError):
+        pass
+    try:
+        status_code = int(parts[-2])
+        if status_code not in STATUS_CODES:
+            status_code = None
+    except (ValueError, IndexError):
+        pass
+    return file_size, status_code
+
+
+def parse_line_bytes(line):
+    """
+    Parse one log line given as bytes, without splitting it.
+
+    The last two fields are located with rfind and the status code is
+    resolved through STATUS_LOOKUP. Lines that do not match this fast
+    shape (a single field, extra or non-ASCII whitespace, unknown codes,
+    bad sizes) are decoded and handed to parse_line, so both parsers
+    always agree.
+
+    Args:
+        line: The log line, as bytes.
+
+    Returns:
+        Tuple (file_size, status_code), as returned by parse_line.
+    """
+    line = line.rstrip()
+    sep = line.rfind(b" ")
+    if sep == -1:
+        return parse_line(line.decode("utf-8", "replace"))
+    code = STATUS_LOOKUP.get(line[line.rfind(b" ", 0, sep) + 1:sep])
+    if code is not None:
+        try:
+            return int(line[sep + 1:]), code
+        except ValueError:
+            pass
+    return parse_line(line.decode("utf-8", "replace"))
+
+
+def parse_client(line):
+    """Return the client IP (first field) of a log line, or None."""
+    parts = line.split(None, 1)
+    return parts[0] if parts else None
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch over non-negative integers.
+
+    Values are counted in logarithmic buckets (DDSketch style) so every
+    quantile is within REL_ERROR of an exact answer. The number of
+    buckets is capped at MAX_BUCKETS, so memory stays constant however
+    many values are added, and two sketches merge by adding buckets.
+    """
+
+    REL_ERROR = 0.01
+    MAX_BUCKETS = 2048
+    _GAMMA = (1 + REL_ERROR) / (1 - REL_ERROR)
+    _LOG_GAMMA = math.log(_GAMMA)
+
+    def __init__(self):
+        """Initialize an empty sketch."""
+        self.count = 0
+        self.zeros = 0
+        self.buckets = {}
+
+    def add(self, value):
+        """Add one value to the sketch."""
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self._LOG_GAMMA)
+        buckets = self.buckets
+        buckets[key] = buckets.get(key, 0) + 1
+        if len(buckets) > self.MAX_BUCKETS:
+            self._collapse()
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        self.count += other.count
+        self.zeros += other.zeros
+        buckets = self.buckets
+        for key, count in other.buckets.items():
+            buckets[key] = buckets.get(key, 0) + count
+        if len(buckets) > self.MAX_BUCKETS:
+            self._collapse()
+
+    def to_state(self):
+        """Return the sketch as plain JSON-serializable values."""
+        return {"count": self.count, "zeros": self.zeros,
+                "buckets": sorted(self.buckets.items())}
+
+    def load_state(self, state):
+        """Restore the sketch from the values returned by to_state."""
+        self.count = state["count"]
+        self.zeros = state["zeros"]
+        self.buckets = {key: count for key, count in state["buckets"]}
+
+    def _collapse(self):
+        """Merge the lowest buckets until the cap is respected."""
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.MAX_BUCKETS
+        floor = keys[excess]
+        for key in keys[:excess]:
+            self.buckets[floor] += self.buckets.pop(key)
+
+    def quantile(self, q):
+        """
+        Return the approximate q-quantile of the values added.
+
+        Args:
+            q: Quantile between 0 and 1.
+
+        Returns:
+            The estimated value, or None if the sketch is empty.
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return round(2 * self._GAMMA ** key / (self._GAMMA + 1))
+        return round(2 * self._GAMMA ** key / (self._GAMMA + 1))
+
+
+class HeavyHitters:
+    """
+    Space-Saving summary of the most frequent keys of a stream.
+
+    At most capacity keys are tracked. A new key replaces the key with
+    the smallest count and inherits that count as its error, so counts
+    are overestimates by at most error, and every key seen more than
+    total / capacity times is guaranteed to be tracked. The minimum is
+    found through a lazy heap whose entries may lag behind the counts.
+    """
+
+    def __init__(self, capacity):
+        """
+        Initialize an empty summary.
+
+        Args:
+            capacity: Maximum number of keys tracked.
+        """
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def add(self, key):
+        """Count one occurrence of key."""
+        counts = self.counts
+        if key in counts:
+            counts[key] += 1
+        elif len(counts) < self.capacity:
+            counts[key] = 1
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (1, key))
+        else:
+            heap = self._heap
+            while heap[0][0] != counts[heap[0][1]]:
+                old = heap[0][1]
+                heapq.heapreplace(heap, (counts[old], old))
+            floor, old = heap[0]
+            del counts[old]
+            del self.errors[old]
+            counts[key] = floor + 1
+            self.errors[key] = floor
+            heapq.heapreplace(heap, (floor + 1, key))
+
+    def _floor(self):
+        """Return the count bound for keys that are not tracked."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        """Fold another summary into this one, keeping the guarantees."""
+        floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for key in set(self.counts) | set(other.counts):
+            counts[key] = (self.counts.get(key, floor) +
+                           other.counts.get(key, other_floor))
+            errors[key] = (self.errors.get(key, floor) +
+                           other.errors.get(key, other_floor))
+        keep = heapq.nlargest(self.capacity, counts, key=counts.get)
+        self.counts = {key: counts[key] for key in keep}
+        self.errors = {key: errors[key] for key in keep}
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def to_state(self):
+        """
+        Return the summary as plain JSON-serializable values.
+
+        Keys read by the bytes path are stored as latin-1 text, which
+        maps every byte to one character and back.
+        """
+        binary = any(isinstance(key, bytes) for key in self.counts)
+        return {"binary": binary, "keys": [
+            [key.decode("latin-1") if binary else key, count,
+             self.errors[key]] for key, count in self.counts.items()]}
+
+    def load_state(self, state):
+        """Restore the summary from the values returned by to_state."""
+        self.counts, self.errors = {}, {}
+        for key, count, error in state["keys"]:
+            if state["binary"]:
+                key = key.encode("latin-1")
+            self.counts[key] = count
+            self.errors[key] = error
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k):
+        """
+        Return the k keys with the largest guaranteed counts.
+
+        The guaranteed count of a key is its count minus its error, a
+        lower bound of its true frequency. Keys whose guaranteed count
+        is 0 may never have been seen more than once and are left out.
+
+        Returns:
+            List of (key, guaranteed_count) pairs, most frequent first.
+        """
+        errors = self.errors
+        guaranteed = ((key, count - errors[key])
+                      for key, count in self.counts.items()
+                      if count > errors[key])
+        return heapq.nlargest(k, guaranteed, key=lambda item: item[1])
+
+
+class SlidingWindows:
+    """
+    Counters over the last few minutes of log time.
+
+    Lines are counted in a ring of time buckets WINDOW_RESOLUTION
+    seconds wide, covering the largest window. The clock is the
+    timestamp embedded in the log lines, so recording a line costs O(1)
+    and a report costs O(buckets) whatever the input rate.
+    """
+
+    _EPOCH = datetime.datetime(1970, 1, 1)
+
+    def __init__(self, windows=WINDOWS, resolution=WINDOW_RESOLUTION):
+        """
+        Initialize empty windows.
+
+        Args:
+            windows: Window lengths in seconds, positive multiples of
+                resolution.
+            resolution: Bucket width in seconds.
+
+        Raises:
+            ValueError: If a window is not a positive multiple of
+                resolution.
+        """
+        for window in windows:
+            if window <= 0 or window % resolution:
+                raise ValueError("windows must be positive multiples of "
+                                 "{} seconds".format(resolution))
+        self.windows = tuple(sorted(windows))
+        self.resolution = resolution
+        size = self.windows[-1] // resolution
+        self.stamps = [None] * size
+        self.lines = [0] * size
+        self.sizes = [0] * size
+        self.counts = [[0] * len(STATUS_CODES) for _ in range(size)]
+        self.newest = None
+        self._last_key = None
+        self._last_time = None
+
+    def timestamp(self, line):
+        """
+        Return the log time of a line in seconds, or None.
+
+        The "[YYYY-MM-DD HH:MM:SS" prefix of the bracketed field is
+        parsed; consecutive lines from the same second reuse the last
+        result.
+        """
+        if isinstance(line, bytes):
+            start = line.find(b"[") + 1
+        else:
+            start = line.find("[") + 1
+        if not start:
+            return None
+        key = line[start:start + 19]
+        if key == self._last_key:
+            return self._last_time
+        if isinstance(key, bytes):
+            key = key.decode("ascii", "replace")
+        try:
+            when = datetime.datetime.fromisoformat(key)
+        except ValueError:
+            return None
+        self._last_key = line[start:start + 19]
+        self._last_time = (when - self._EPOCH).total_seconds()
+        return self._last_time
+
+    def _slot(self, tick):
+        """Return the ring slot of a bucket tick, or None if too old."""
+        size = len(self.stamps)
+        if self.newest is not None and tick <= self.newest - size:
+            return None
+        if self.newest is None or tick > self.newest:
+            self.newest = tick
+        slot = tick % size
+        if self.stamps[slot] != tick:
+            self.stamps[slot] = tick
+            self.lines[slot] = 0
+            self.sizes[slot] = 0
+            self.counts[slot] = [0] * len(STATUS_CODES)
+        return slot
+
+    def add(self, line, file_size, status_code):
+        """Record one parsed log line at the time it carries."""
+        when = self.timestamp(line)
+        if when is None:
+            return
+        slot = self._slot(int(when // self.resolution))
+        if slot is None:
+            return
+        self.lines[slot] += 1
+        if file_size is not None:
+            self.sizes[slot] += file_size
+        if status_code is not None:
+            self.counts[slot][CODE_INDEX[status_code]] += 1
+
+    def merge(self, other):
+        """Fold the buckets of another SlidingWindows into this one."""
+        used = [j for j, tick in enumerate(other.stamps) if tick is not None]
+        for j in sorted(used, key=other.stamps.__getitem__):
+            slot = self._slot(other.stamps[j])
+            if slot is None:
+                continue
+            self.lines[slot] += other.lines[j]
+            self.sizes[slot] += other.sizes[j]
+            self.counts[slot] = [a + b for a, b in
+                                 zip(self.counts[slot], other.counts[j])]
+
+    def to_state(self):
+        """Return the buckets as plain JSON-serializable values."""
+        return {"newest": self.newest, "stamps": self.stamps,
+                "lines": self.lines, "sizes": self.sizes,
+                "counts": self.counts}
+
+    def load_state(self, state):
+        """Restore the buckets from the values returned by to_state."""
+        self.newest = state["newest"]
+        self.stamps = state["stamps"]
+        self.lines = state["lines"]
+        self.sizes = state["sizes"]
+        self.counts = state["counts"]
+
+    def totals(self, window):
+        """
+        Return (lines, total_size, status_counts) over a window.
+
+        Args:
+            window: Window length in seconds, ending at the newest
+                bucket seen.
+        """
+        lines = 0
+        total_size = 0
+        counts = [0] * len(STATUS_CODES)
+        if self.newest is not None:
+            oldest = self.newest - window // self.resolution
+            for slot, tick in enumerate(self.stamps):
+                if tick is not None and tick > oldest:
+                    lines += self.lines[slot]
+                    total_size += self.sizes[slot]
+                    counts = [a + b for a, b in
+                              zip(counts, self.counts[slot])]
+        return lines, total_size, dict(zip(STATUS_CODES, counts))
+
+
+class LogStats:
+    """Running log metrics that can be merged across shards."""
+
+    def __init__(self, percentiles=False, top_clients=0, windows=()):
+        """
+        Initialize empty metrics.
+
+        Args:
+            percentiles: Whether to keep response size sketches.
+            top_clients: Number of most frequent client IPs to report
+                (0 disables client tracking).
+            windows: Sliding window lengths in seconds of log time
+                (empty disables windowed counters).
+        """
+        self.total_size = 0
+        self.line_count = 0
+        self.status_counts = new_status_counts()
+        self.sizes = None
+        self.code_sizes = None
+        if percentiles:
+            self.sizes = QuantileSketch()
+            self.code_sizes = {code: QuantileSketch()
+                               for code in STATUS_CODES}
+        self.top_clients = top_clients
+        self.clients = None
+        if top_clients:
+            self.clients = HeavyHitters(top_clients * CLIENT_SLOTS)
+        self.windows = SlidingWindows(windows) if windows else None
+
+    def add(self, file_size, status_code, line=None):
+        """
+        Record one parsed log line.
+
+        Args:
+            file_size: File size returned by the parser.
+            status_code: Status code returned by the parser.
+            line: The raw line, needed only for client tracking and
+                sliding windows.
+        """
+        self.line_count += 1
+        if file_size is not None:
+            self.total_size += file_size
+        if status_code is not None:
+            self.status_counts[status_code] += 1
+        if self.sizes is not None and file_size is not None:
+            self.sizes.add(file_size)
+            if status_code is not None:
+                self.code_sizes[status_code].add(file_size)
+        if self.clients is not None and line is not None:
+            client = parse_client(line)
+            if client is not None:
+                self.clients.add(client)
+        if self.windows is not None and line is not None:
+            self.windows.add(line, file_size, status_code)
+
+    @property
+    def needs_lines(self):
+        """Whether the raw lines are needed, not just their fields."""
+        return self.clients is not None or self.windows is not None
+
+    def add_block(self, data, every=0, first_line=0, report=None):
+        """
+        Record a block of lines given as bytes, without a Python loop.
+
+        A single findall of BLOCK_LINE extracts the status code and
+        size of every well-formed line, which are counted with Counter
+        and summed with map; only the other lines go through
+        parse_line_bytes, so the result is the one add would give line
+        by line. Client tracking and sliding windows are not updated:
+        use add when needs_lines is true.
+
+        Args:
+            data: Whole lines separated by newlines, the last one
+                optionally followed by a newline.
+            every: If set, the block is recorded in slices so that
+                report is called each time first_line plus the line
+                count reaches a multiple of every.
+            first_line: Number of lines preceding these metrics.
+            report: Function called without arguments at each report.
+        """
+        if data.endswith(b"\n"):
+            data = data[:-1]
+        codes, sizes, others = zip(*BLOCK_LINE.findall(data))
+        start = 0
+        while every:
+            end = start + every - (first_line + self.line_count) % every
+            if end > len(codes):
+                break
+            self._add_rows(codes[start:end], sizes[start:end],
+                           others[start:end])
+            report()
+            start = end
+        if start < len(codes):
+            if start:
+                codes, sizes, others = (
+                    codes[start:], sizes[start:], others[start:])
+            self._add_rows(codes, sizes, others)
+
+    def _add_rows(self, codes, sizes, others):
+        """Record the BLOCK_LINE groups of consecutive lines."""
+        counts = Counter(codes)
+        slow = counts.pop(b"", 0)
+        self.line_count += len(codes) - slow
+        for code, count in counts.items():
+            self.status_counts[STATUS_LOOKUP[code]] += count
+        self.total_size += sum(map(int, filter(None, sizes)))
+        if self.sizes is not None:
+            for code, size in zip(codes, sizes):
+                if code:
+                    size = int(size)
+                    self.sizes.add(size)
+                    self.code_sizes[STATUS_LOOKUP[code]].add(size)
+        if slow:
+            add = self.add
+            for line in compress(others, map(not_, codes)):
+                add(*parse_line_bytes(line), line)
+
+    def merge(self, other):
+        """Fold the metrics of another LogStats into this one."""
+        self.total_size += other.total_size
+        self.line_count += other.line_count
+        for code, count in other.status_counts.items():
+            self.status_counts[code] += count
+        if self.sizes is not None and other.sizes is not None:
+            self.sizes.merge(other.sizes)
+            for code, sketch in other.code_sizes.items():
+                self.code_sizes[code].merge(sketch)
+        if self.clients is not None and other.clients is not None:
+            self.clients.merge(other.clients)
+        if self.windows is not None and other.windows is not None:
+            self.windows.merge(other.windows)
+
+    def to_state(self):
+        """
+        Return the metrics as plain JSON-serializable values.
+
+        The options of the LogStats are not part of the state: restore
+        it with load_state on a LogStats built with the same options.
+        """
+        state = {"total_size": self.total_size,
+                 "line_count": self.line_count,
+                 "status_counts": list(_as_tuple(self.status_counts))}
+        if self.sizes is not None:
+            state["sizes"] = self.sizes.to_state()
+            state["code_sizes"] = [self.code_sizes[code].to_state()
+                                   for code in STATUS_CODES]
+        if self.clients is not None:
+            state["clients"] = self.clients.to_state()
+        if self.windows is not None:
+            state["windows"] = self.windows.to_state()
+        return state
+
+    def load_state(self, state):
+        """Restore the metrics from the values returned by to_state."""
+        self.total_size = state["total_size"]
+        self.line_count = state["line_count"]
+        self.status_counts = _as_dict(state["status_counts"])
+        if self.sizes is not None:
+            self.sizes.load_state(state["sizes"])
+            for code, sketch in zip(STATUS_CODES, state["code_sizes"]):
+                self.code_sizes[code].load_state(sketch)
+        if self.clients is not None:
+            self.clients.load_state(state["clients"])
+        if self.windows is not None:
+            self.windows.load_state(state["windows"])
+
+    def report(self, details=False):
+        """
+        Return the report text for the metrics.
+
+        Args:
+            details: Whether to append the sketch-based sections, which
+                are printed with timed and final reports only.
+        """
+        text = format_stats(self.total_size, self.status_counts)
+        if details and self.sizes is not None:
+            text += format_percentiles(self.sizes, self.code_sizes)
+        if details and self.clients is not None:
+            text += format_clients(self.clients.top(self.top_clients))
+        if details and self.windows is not None:
+            text += format_windows(self.windows)
+        return text
+
+    def to_dict(self, details=False):
+        """
+        Return the metrics as a JSON-ready dictionary.
+
+        Args:
+            details: Whether to include the sketch-based sections.
+        """
+        data = stats_dict(self.line_count, self.total_size,
+                          self.status_counts)
+        if details and self.sizes is not None:
+            data["percentiles"] = {
+                label: {"p{}".format(p): sketch.quantile(p / 100)
+                        for p in PERCENTILES}
+                for label, sketch in [("all", self.sizes)] + [
+                    (str(code), self.code_sizes[code])
+                    for code in STATUS_CODES]
+                if sketch.count > 0}
+        if details and self.clients is not None:
+            data["top_clients"] = [
+                [_text(client), count]
+                for client, count in self.clients.top(self.top_clients)]
+        if details and self.windows is not None:
+            data["windows"] = {}
+            for window in self.windows.windows:
+                data["windows"][str(window)] = stats_dict(
+                    *self.windows.totals(window))
+        return data
+
+
+def _text(value):
+    """Return value decoded to str if it is bytes."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return value
+
+
+def format_percentiles(sizes, code_sizes):
+    """Return the response size percentiles as one block of text."""
+    def row(label, sketch):
+        return "{} {}\n".format(label, " ".join(
+            "p{}: {}".format(p, sketch.quantile(p / 100))
+            for p in PERCENTILES))
+
+    if sizes.count == 0:
+        return ""
+    lines = [row("Size", sizes)]
+    for code in sorted(code_sizes.keys()):
+        if code_sizes[code].count > 0:
+            lines.append(row("Size {}".format(code), code_sizes[code]))
+    return "".join(lines)
+
+
+def format_clients(top):
+    """Return the most frequent client IPs as one block of text."""
+    if not top:
+        return ""
+    lines = ["Top {} clients:\n".format(len(top))]
+    for client, count in top:
+        lines.append("{}: {}\n".format(_text(client), count))
+    return "".join(lines)
+
+
+def format_windows(windows):
+    """Return the sliding window counters as one block of text."""
+    lines = []
+    for window in windows.windows:
+        count, total_size, status_counts = windows.totals(window)
+        fields = ["{} lines ({:.2f}/s)".format(count, count / window),
+                  "File size: {} ({:.2f}/s)".format(total_size,
+                                                    total_size / window)]
+        for code in sorted(status_counts.keys()):
+            if status_counts[code] > 0:
+                fields.append("{}: {}".format(code, status_counts[code]))
+        lines.append("Last {}s: {}\n".format(window, ", ".join(fields)))
+    return "".join(lines)
+
+
+def format_prometheus(data):
+    """
+    Return a metrics dictionary in the Prometheus text format.
+
+    Args:
+        data: Dictionary returned by LogStats.to_dict.
+    """
+    lines = [
+        "# TYPE log_lines_total counter",
+        "log_lines_total {}".format(data["lines"]),
+        "# TYPE log_file_size_bytes_total counter",
+        "log_file_size_bytes_total {}".format(data["file_size"]),
+        "# TYPE log_status_total counter",
+    ]
+    for code, count in data["status_codes"].items():
+        lines.append('log_status_total{{code="{}"}} {}'.format(code, count))
+    if "percentiles" in data:
+        lines.append("# TYPE log_response_size_bytes summary")
+        for label, values in data["percentiles"].items():
+            code = "" if label == "all" else 'code="{}",'.format(label)
+            for p in PERCENTILES:
+                lines.append('log_response_size_bytes{{{}quantile="{}"}} {}'
+                             .format(code, p / 100, values["p{}".format(p)]))
+    if "top_clients" in data:
+        lines.append("# TYPE log_client_requests gauge")
+        for client, count in data["top_clients"]:
+            lines.append('log_client_requests{{client="{}"}} {}'.format(
+                client.replace("\\", "\\\\").replace('"', '\\"'), count))
+    if "windows" in data:
+        windows = data["windows"].items()
+        lines.append("# TYPE log_window_lines gauge")
+        for window, totals in windows:
+            lines.append('log_window_lines{{window="{}"}} {}'.format(
+                window, totals["lines"]))
+        lines.append("# TYPE log_window_file_size_bytes gauge")
+        for window, totals in windows:
+            lines.append('log_window_file_size_bytes{{window="{}"}} {}'
+                         .format(window, totals["file_size"]))
+        lines.append("# TYPE log_window_status gauge")
+        for window, totals in windows:
+            for code, count in totals["status_codes"].items():
+                lines.append('log_window_status{{window="{}",code="{}"}} {}'
+                             .format(window, code, count))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    HTTP endpoint serving the last published metrics snapshot.
+
+    The server runs in a daemon thread. The ingest loop only replaces
+    the snapshot reference, and scrapes render whichever snapshot is
+    current, so a slow scrape never holds up ingestion.
+    """
+
+    def __init__(self, port):
+        """
+        Start serving /metrics on a port.
+
+        Args:
+            port: TCP port to listen on.
+        """
+        self.snapshot = stats_dict(0, 0, new_status_counts())
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Serve the snapshot of the enclosing MetricsServer."""
+
+            def do_GET(self):
+                """Handle /metrics, and 404 for any other path."""
+                if self.path == '/metrics':
+                    body = format_prometheus(server.snapshot).encode()
+                    self.send_response(200)
+                    self.send_header('Content-type',
+                                     'text/plain; version=0.0.4')
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_response(404)
+                    self.send_header('Content-type', 'text/plain')
+                    self.end_headers()
+                    self.wfile.write(b"Endpoint not found")
+
+            def log_message(self, format, *args):
+                """Keep scrapes out of stderr."""
+
+        self.httpd = HTTPServer(('', port), Handler)
+        threading.Thread(target=self.httpd.serve_forever,
+                         daemon=True).start()
+
+    def publish(self, stats):
+        """Replace the served snapshot with the current metrics."""
+        self.snapshot = stats.to_dict(details=True)
+
+    def publish_counts(self, line_count, total_size, status_counts):
+        """
+        Update the counters of the served snapshot.
+
+        The sketch-based sections are kept from the last publish, so
+        this is cheap enough to run on every periodic report.
+        """
+        self.snapshot = dict(self.snapshot, **stats_dict(
+            line_count, total_size, status_counts))
+
+
+class Reporter:
+    """Writes reports as text or JSON lines and feeds a MetricsServer."""
+
+    def __init__(self, output="text", server=None):
+        """
+        Initialize a reporter.
+
+        Args:
+            output: "text" for the classic report, "json" for one JSON
+                object per line.
+            server: Optional MetricsServer to publish snapshots to.
+        """
+        self.output = output
+        self.server = server
+
+    def _write(self, text, flush):
+        """Write one report in a single call."""
+        sys.stdout.write(text)
+        if flush:
+            sys.stdout.flush()
+
+    def report(self, stats, details=False, flush=False):
+        """
+        Write a report of stats.
+
+        Args:
+            stats: The LogStats to report.
+            details: Whether to include the sketch-based sections, as
+                done for timed and final reports.
+            flush: Whether to flush stdout afterwards.
+        """
+        if self.output == "json":
+            self._write(json.dumps(stats.to_dict(details)) + "\n", flush)
+        else:
+            self._write(stats.report(details), flush)
+        if details:
+            self.publish(stats)
+        elif self.server is not None:
+            self.server.publish_counts(stats.line_count, stats.total_size,
+                                       stats.status_counts)
+
+    def snapshot(self, line_count, total_size, status_counts):
+        """Write a periodic report from bare counters."""
+        if self.output == "json":
+            self._write(json.dumps(stats_dict(line_count, total_size,
+                                              status_counts)) + "\n", False)
+        else:
+            self._write(format_stats(total_size, status_counts), False)
+        if self.server is not None:
+            self.server.publish_counts(line_count, total_size,
+                                       status_counts)
+
+    def publish(self, stats):
+        """Publish stats to the server, if there is one."""
+        if self.server is not None:
+            self.server.publish(stats)
+
+
+def decompressor(head):
+    """
+    Return the file class decompressing data that starts with head.
+
+    Args:
+        head: The first bytes of the data.
+
+    Returns:
+        GzipFile, BZ2File or LZMAFile, or None if head matches no
+        known compression format.
+    """
+    for magic, cls in COMPRESSED:
+        if head.startswith(magic):
+            return cls
+    return None
+
+
+class ThreadedReader:
+    """
+    Binary reader that decompresses in a background thread.
+
+    The thread reads chunk_size blocks from the decompressing file and
+    queues up to READ_AHEAD of them, so decompression (which releases
+    the GIL) overlaps with parsing in the main thread.
+    """
+
+    def __init__(self, fileobj, chunk_size=CHUNK_SIZE):
+        """
+        Start decompressing.
+
+        Args:
+            fileobj: A binary file object, e.g. a GzipFile.
+            chunk_size: Number of decompressed bytes per block.
+        """
+        self._queue = queue.Queue(READ_AHEAD)
+        self._done = False
+        self._thread = threading.Thread(
+            target=self._fill, args=(fileobj, chunk_size), daemon=True)
+        self._thread.start()
+
+    def _fill(self, fileobj, chunk_size):
+        """Feed decompressed blocks, then b"" or the error, to the queue."""
+        try:
+            with fileobj:
+                while True:
+                    chunk = fileobj.read(chunk_size)
+                    self._queue.put(chunk)
+                    if not chunk:
+                        break
+        except Exception as error:
+            self._queue.put(error)
+
+    def read1(self, size=-1):
+        """Return the next decompressed block, or b"" at the end."""
+        if self._done:
+            return b""
+        chunk = self._queue.get()
+        if isinstance(chunk, Exception):
+            self._done = True
+            raise chunk
+        if not chunk:
+            self._done = True
+        return chunk
+
+    read = read1
+
+
+class PrefixedReader:
+    """Binary reader returning some already read bytes, then a file."""
+
+    def __init__(self, head, fileobj):
+        """
+        Initialize the reader.
+
+        Args:
+            head: The bytes read from fileobj so far.
+            fileobj: The binary file object to continue with.
+        """
+        self._head = head
+        self._file = fileobj
+        self._read1 = getattr(fileobj, "read1", fileobj.read)
+
+    def read(self, size=-1):
+        """Read up to size bytes (all of them if size < 0)."""
+        head = self._head
+        if not head:
+            return self._file.read(size)
+        if 0 <= size <= len(head):
+            self._head = head[size:]
+            return head[:size]
+        self._head = b""
+        return head + self._file.read(-1 if size < 0 else size - len(head))
+
+    def read1(self, size=-1):
+        """Read up to size bytes with at most one read of the file."""
+        head = self._head
+        if not head:
+            return self._read1(size)
+        if size < 0:
+            size = len(head)
+        self._head = head[size:]
+        return head[:size]
+
+
+def open_log(fileobj):
+    """
+    Return a binary reader over a possibly compressed log.
+
+    The first bytes are read until the longest magic number is
+    available, as a pipe may deliver fewer bytes per read, and are
+    handed back before the rest of the stream.
+
+    Args:
+        fileobj: A binary file object, such as sys.stdin.buffer or
+            open(path, "rb").
+
+    Returns:
+        A reader over the log bytes, decompressing them in a
+        ThreadedReader if needed.
+    """
+    size = max(len(magic) for magic, cls in COMPRESSED)
+    read = getattr(fileobj, "read1", fileobj.read)
+    head = b""
+    while len(head) < size:
+        chunk = read(size - len(head))
+        if not chunk:
+            break
+        head += chunk
+    stream = PrefixedReader(head, fileobj)
+    cls = decompressor(head)
+    if cls is None:
+        return stream
+    return ThreadedReader(cls(fileobj=stream) if cls is gzip.GzipFile
+                          else cls(stream))
+
+
+def read_lines(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yield the lines of a binary stream, reading it in large chunks.
+
+    Args:
+        stream: A binary file object such as sys.stdin.buffer.
+        chunk_size: Maximum number of bytes per read.
+
+    Yields:
+        Each line as bytes, without its trailing newline.
+    """
+    read = getattr(stream, "read1", stream.read)
+    tail = b""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def read_blocks(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yield a binary stream as blocks of whole lines.
+
+    Args:
+        stream: A binary file object such as sys.stdin.buffer.
+        chunk_size: Maximum number of bytes per read.
+
+    Yields:
+        Non-empty bytes ending with a newline, except for a last line
+        without one.
+    """
+    read = getattr(stream, "read1", stream.read)
+    tail = b""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        end = chunk.rfind(b"\n") + 1
+        if end:
+            yield tail + chunk[:end]
+            tail = chunk[end:]
+        else:
+            tail += chunk
+    if tail:
+        yield tail
+
+
+def block_stats(blocks, every=10, interval=None, stats=None,
+                reporter=None):
+    """
+    Compute metrics over blocks of lines, printing them periodically.
+
+    Blocks are aggregated with LogStats.add_block, in slices ending
+    where a report falls every this many lines, so the reports are the
+    ones stream_stats would print at a fraction of the cost per line.
+
+    Args:
+        blocks: An iterable of blocks, as yielded by read_blocks.
+        every: Report every this many lines (0 disables it).
+        interval: Report at most every this many seconds, checked
+            after each block.
+        stats: LogStats to accumulate into (default: a new one). It
+            must not need the raw lines.
+        reporter: Reporter writing the reports (default: text).
+
+    Returns:
+        The LogStats holding the final metrics.
+    """
+    if stats is None:
+        stats = LogStats()
+    if reporter is None:
+        reporter = Reporter()
+    add_block = stats.add_block
+    deadline = time.monotonic() + interval if interval else None
+
+    def report():
+        reporter.report(stats)
+
+    try:
+        for block in blocks:
+            add_block(block, every, report=report)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                reporter.report(stats, details=True, flush=True)
+                deadline = time.monotonic() + interval
+            else:
+                reporter.publish(stats)
+
+    except KeyboardInterrupt:
+        reporter.report(stats, details=True)
+        raise
+
+    reporter.report(stats, details=True)
+    return stats
+
+
+def binary_stats(stream, every=10, interval=None, stats=None,
+                 reporter=None):
+    """
+    Compute metrics over a binary stream with the fastest path.
+
+    Blocks are aggregated at once unless client tracking or sliding
+    windows need every raw line, in which case lines are parsed one by
+    one with parse_line_bytes.
+
+    Args:
+        stream: A binary file object, as returned by open_log.
+        every: Report every this many lines (0 disables it).
+        interval: Report at most every this many seconds, if given.
+        stats: LogStats to accumulate into (default: a new one).
+        reporter: Reporter writing the reports (default: text).
+
+    Returns:
+        The LogStats holding the final metrics.
+    """
+    if stats is None:
+        stats = LogStats()
+    if stats.needs_lines:
+        return stream_stats(read_lines(stream), parse_line_bytes, every,
+                            interval, stats, reporter)
+    return block_stats(read_blocks(stream), every, interval, stats,
+                       reporter)
+
+
+def stream_stats(stream, parse=parse_line, every=10, interval=None,
+                 stats=None, reporter=None):
+    """
+    Compute metrics over a stream of lines, printing them periodically.
+
+    Args:
+        stream: An iterable of log lines.
+        parse: Function parsing one line, parse_line or parse_line_bytes.
+        every: Report every this many lines (0 disables it).
+        interval: Report at most every this many seconds, if given.
+        stats: LogStats to accumulate into (default: a new one).
+        reporter: Reporter writing the reports (default: text).
+
+    Returns:
+        The LogStats holding the final metrics.
+    """
+    if stats is None:
+        stats = LogStats()
+    if reporter is None:
+        reporter = Reporter()
+    add = stats.add
+    deadline = time.monotonic() + interval if interval else None
+    published = None
+    if reporter.server is not None:
+        published = time.monotonic() + PUBLISH_INTERVAL
+
+    try:
+        for line in stream:
+            add(*parse(line), line)
+
+            if every and stats.line_count % every == 0:
+                reporter.report(stats)
+            if deadline is not None and time.monotonic() >= deadline:
+                reporter.report(stats, details=True, flush=True)
+                deadline = time.monotonic() + interval
+            if published is not None and time.monotonic() >= published:
+                reporter.publish(stats)
+                published = time.monotonic() + PUBLISH_INTERVAL
 
     except KeyboardInterrupt:
-        print_stats(total_size, status_counts)
+        reporter.report(stats, details=True)
         raise
 
-    print_stats(total_size, status_counts)
+    reporter.report(stats, details=True)
+    return stats
+
+
+def split_shards(mm, shard_size=SHARD_SIZE, start=0):
+    """
+    Split a mapped file into (start, end) ranges ending on a newline.
+
+    Args:
+        mm: The memory-mapped file.
+        shard_size: Approximate number of bytes per shard.
+        start: Offset of the first byte to cover.
+
+    Returns:
+        List of (start, end) byte ranges covering the file from start.
+    """
+    shards = []
+    size = len(mm)
+    while start < size:
+        newline = mm.find(b"\n", min(start + shard_size, size) - 1)
+        end = size if newline == -1 else newline + 1
+        shards.append((start, end))
+        start = end
+    return shards
+
+
+def _count_lines(job):
+    """Count the lines of one shard, as iterating over stdin would."""
+    path, start, end = job
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = mm[start:end]
+    count = data.count(b"\n")
+    if not data.endswith(b"\n"):
+        count += 1
+    return count
+
+
+def _scan_shard(job):
+    """
+    Parse one shard of a mapped log file.
+
+    Args:
+        job: Tuple (path, start, end, first_line, every, options) where
+            first_line is the number of lines preceding the shard in
+            the file, every is the report period in lines and options
+            are the LogStats keyword arguments.
+
+    Returns:
+        Tuple (stats, snapshots). stats is the shard LogStats and
+        snapshots holds the shard-local (line_count, total_size,
+        counts) at every line where the stdin path would print a
+        report, counts following the order of STATUS_CODES.
+    """
+    path, start, end, first_line, every, options = job
+    stats = LogStats(**options)
+    add = stats.add
+    snapshots = []
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = mm[start:end]
+
+    def snapshot():
+        snapshots.append((stats.line_count, stats.total_size,
+                          _as_tuple(stats.status_counts)))
+
+    if not stats.needs_lines:
+        if data:
+            stats.add_block(data, every, first_line, snapshot)
+        return stats, snapshots
+
+    lines = data.split(b"\n")
+    if not lines[-1]:
+        lines.pop()
+    for line in lines:
+        add(*parse_line_bytes(line), line)
+        if every and (first_line + stats.line_count) % every == 0:
+            snapshot()
+    return stats, snapshots
+
+
+def _as_tuple(status_counts):
+    """Pack a status code counter into a tuple ordered by STATUS_CODES."""
+    return tuple(status_counts[code] for code in STATUS_CODES)
+
+
+def _as_dict(counts):
+    """Unpack a tuple ordered by STATUS_CODES into a status counter."""
+    return dict(zip(STATUS_CODES, counts))
+
+
+def _add(counts, other):
+    """Add two status count tuples element-wise."""
+    return tuple(a + b for a, b in zip(counts, other))
+
+
+def _log_identity(path):
+    """Return what identifies a log file across runs."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_dev, st.st_ino
+
+
+def save_checkpoint(checkpoint, path, options, offset, stats):
+    """
+    Atomically save the aggregation state of a log file as JSON.
+
+    Args:
+        checkpoint: Path of the checkpoint file.
+        path: Path of the log file being aggregated.
+        options: LogStats keyword arguments of the run.
+        offset: Byte offset up to which stats is complete.
+        stats: The LogStats accumulated so far.
+    """
+    state = {"log": _log_identity(path), "options": options,
+             "offset": offset, "stats": stats.to_state()}
+    tmp = checkpoint + ".tmp"
+    with open(tmp, mode="w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp, checkpoint)
+
+
+def load_checkpoint(checkpoint, path, options):
+    """
+    Load the aggregation state saved for a log file.
+
+    The checkpoint only holds JSON data, so a file that was tampered
+    with cannot run code; at worst it is ignored.
+
+    Args:
+        checkpoint: Path of the checkpoint file.
+        path: Path of the log file to aggregate.
+        options: LogStats keyword arguments of the run.
+
+    Returns:
+        Tuple (offset, stats), or None if there is no checkpoint or it
+        is unreadable, or belongs to another file, another set of
+        options, or a file that has since shrunk.
+    """
+    try:
+        with open(checkpoint, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        state = None
+    # Tuples come back as lists, so compare through a JSON round trip.
+    expected = json.loads(json.dumps([_log_identity(path), options]))
+    try:
+        if ([state["log"], state["options"]] == expected and
+                state["offset"] <= os.path.getsize(path)):
+            stats = LogStats(**options)
+            stats.load_state(state["stats"])
+            return state["offset"], stats
+    except (KeyError, TypeError, ValueError):
+        pass
+    print("Ignoring stale checkpoint {}".format(checkpoint),
+          file=sys.stderr)
+    return None
+
+
+def file_stats(path, workers=None, every=10, interval=None, options=None,
+               checkpoint=None, checkpoint_every=CHECKPOINT_EVERY,
+               reporter=None):
+    """
+    Compute metrics over a log file using a pool of worker processes.
+
+    The file is memory-mapped, split into shards at newline boundaries
+    and each shard is parsed by a worker. Partials are merged in file
+    order so the output is exactly the one the stdin path would print.
+
+    Args:
+        path: Path of the log file.
+        workers: Number of worker processes (default: CPU count).
+        every: Report every this many lines (0 disables it).
+        interval: Report at most every this many seconds, checked
+            each time a shard is merged.
+        options: LogStats keyword arguments.
+        checkpoint: Path of a checkpoint file. If it holds the state of
+            an earlier run on the same file, aggregation resumes from
+            its byte offset; the state is saved there every
+            checkpoint_every seconds and on interruption, and the file
+            is removed once the whole log has been aggregated.
+        checkpoint_every: Seconds between checkpoints.
+        reporter: Reporter writing the reports (default: text).
+
+    Returns:
+        The LogStats holding the final metrics.
+    """
+    options = options or {}
+    if reporter is None:
+        reporter = Reporter()
+    stats = LogStats(**options)
+    offset = 0
+    if checkpoint:
+        saved = load_checkpoint(checkpoint, path, options)
+        if saved is not None:
+            offset, stats = saved
+
+    if os.path.getsize(path) == offset:
+        reporter.report(stats, details=True)
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return stats
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            shards = split_shards(mm, start=offset)
+
+    deadline = time.monotonic() + interval if interval else None
+    saved_at = time.monotonic()
+
+    try:
+        with Pool(workers) as pool:
+            if every:
+                line_counts = pool.map(
+                    _count_lines, [(path, s, e) for s, e in shards])
+            else:
+                line_counts = [0] * len(shards)
+            jobs = []
+            first_line = stats.line_count
+            for (start, end), lines in zip(shards, line_counts):
+                jobs.append((path, start, end, first_line, every, options))
+                first_line += lines
+
+            for (start, end), (part, snapshots) in zip(
+                    shards, pool.imap(_scan_shard, jobs)):
+                counts = _as_tuple(stats.status_counts)
+                for snap_lines, snap_size, snap_counts in snapshots:
+                    reporter.snapshot(stats.line_count + snap_lines,
+                                      stats.total_size + snap_size,
+                                      _as_dict(_add(counts, snap_counts)))
+                stats.merge(part)
+                offset = end
+                if deadline is not None and time.monotonic() >= deadline:
+                    reporter.report(stats, details=True, flush=True)
+                    deadline = time.monotonic() + interval
+                else:
+                    reporter.publish(stats)
+                if (checkpoint and
+                        time.monotonic() - saved_at >= checkpoint_every):
+                    save_checkpoint(checkpoint, path, options, offset, stats)
+                    saved_at = time.monotonic()
+
+    except KeyboardInterrupt:
+        if checkpoint:
+            save_checkpoint(checkpoint, path, options, offset, stats)
+        reporter.report(stats, details=True)
+        raise
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    reporter.report(stats, details=True)
+    return stats
+
+
+def _scan_file(path, options):
+    """
+    Parse a whole, possibly compressed, log file in a worker.
+
+    Returns:
+        Tuple (path, stats, seconds) where stats is the file LogStats
+        and seconds the time spent on it.
+    """
+    start = time.perf_counter()
+    stats = LogStats(**options)
+    with open(path, "rb") as f:
+        stream = open_log(f)
+        if stats.needs_lines:
+            add = stats.add
+            for line in read_lines(stream):
+                add(*parse_line_bytes(line), line)
+        else:
+            for block in read_blocks(stream):
+                stats.add_block(block)
+    return path, stats, time.perf_counter() - start
+
+
+def files_stats(paths, workers=None, interval=None, options=None,
+                verbose=False, reporter=None):
+    """
+    Compute metrics over many log files using a pool of workers.
+
+    Each file is parsed by one worker. At most twice as many files as
+    there are workers are in flight, and results are merged as they
+    complete, in any order. Only timed and final reports are printed.
+
+    Args:
+        paths: Paths of the log files.
+        workers: Number of worker processes (default: CPU count).
+        interval: Report at most every this many seconds, checked
+            each time a file is merged.
+        options: LogStats keyword arguments.
+        verbose: Whether to print per-file throughput to stderr.
+        reporter: Reporter writing the reports (default: text).
+
+    Returns:
+        The LogStats holding the final metrics.
+    """
+    options = options or {}
+    if reporter is None:
+        reporter = Reporter()
+    stats = LogStats(**options)
+    results = queue.Queue()
+    limit = 2 * (workers or os.cpu_count() or 1)
+    pending = 0
+    deadline = time.monotonic() + interval if interval else None
+
+    def merge_one():
+        result = results.get()
+        if isinstance(result, BaseException):
+            raise result
+        path, part, seconds = result
+        stats.merge(part)
+        reporter.publish(stats)
+        if verbose:
+            size = os.path.getsize(path)
+            print("{}: {} lines, {} bytes in {:.2f}s "
+                  "({:.0f} lines/s, {:.2f} MB/s)".format(
+                      path, part.line_count, size, seconds,
+                      part.line_count / seconds if seconds else 0,
+                      size / seconds / 1e6 if seconds else 0),
+                  file=sys.stderr)
+
+    try:
+        with Pool(workers) as pool:
+            for path in paths:
+                if pending >= limit:
+                    merge_one()
+                    pending -= 1
+                pool.apply_async(_scan_file, (path, options),
+                                 callback=results.put,
+                                 error_callback=results.put)
+                pending += 1
+                if deadline is not None and time.monotonic() >= deadline:
+                    reporter.report(stats, details=True, flush=True)
+                    deadline = time.monotonic() + interval
+            while pending:
+                merge_one()
+                pending -= 1
+                if deadline is not None and time.monotonic() >= deadline:
+                    reporter.report(stats, details=True, flush=True)
+                    deadline = time.monotonic() + interval
+
+    except KeyboardInterrupt:
+        reporter.report(stats, details=True)
+        raise
+
+    reporter.report(stats, details=True)
+    return stats
+
+
+def expand_paths(patterns):
+    """Return the files named by paths or glob patterns, in order."""
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute log metrics.")
+    parser.add_argument("paths", nargs="*", metavar="PATH",
+                        help="log files or glob patterns to aggregate "
+                        "instead of reading stdin")
+    parser.add_argument("--file", help="log file to memory-map and "
+                        "parse in parallel instead of reading stdin")
+    parser.add_argument("--binary", action="store_true",
+                        help="read stdin as bytes with the fast parser")
+    parser.add_argument("--every", type=int, default=None,
+                        help="report every N lines (default 10, or "
+                        "never when --interval is given)")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="report every N seconds of wall-clock time")
+    parser.add_argument("--percentiles", action="store_true",
+                        help="report p50/p90/p99 of response sizes")
+    parser.add_argument("--top-clients", type=int, default=0, metavar="K",
+                        help="report the K most frequent client IPs "
+                        "with a lower bound of their request count")
+    parser.add_argument("--windows", nargs="?", metavar="SECONDS",
+                        const=",".join(str(w) for w in WINDOWS),
+                        help="report counters over the last SECONDS "
+                        "(comma separated multiples of {}) of log time, "
+                        "default %(const)s".format(WINDOW_RESOLUTION))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes for --file "
+                        "and PATH")
+    parser.add_argument("--format", choices=("text", "json"),
+                        default="text",
+                        help="report as text or as one JSON object per "
+                        "line, default %(default)s")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="serve the latest counters in Prometheus "
+                        "text format on http://localhost:PORT/metrics")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print per-file throughput to stderr")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="checkpoint file used to resume --file runs")
+    parser.add_argument("--checkpoint-every", type=float,
+                        default=CHECKPOINT_EVERY, metavar="SECONDS",
+                        help="seconds between checkpoints, default "
+                        "%(default)s")
+    args = parser.parse_args()
+    every = args.every
+    if every is None:
+        every = 0 if args.interval else 10
+    options = {"percentiles": args.percentiles,
+               "top_clients": args.top_clients,
+               "windows": tuple(int(w) for w in args.windows.split(","))
+               if args.windows else ()}
+
+    for window in options["windows"]:
+        if window <= 0 or window % WINDOW_RESOLUTION:
+            parser.error("--windows must be positive multiples of {} "
+                         "seconds".format(WINDOW_RESOLUTION))
+
+    paths = expand_paths(args.paths)
+    if args.file and paths:
+        parser.error("--file and PATH cannot be combined")
+    if len(paths) == 1:
+        args.file = paths.pop()
+
+    if args.checkpoint and not args.file:
+        parser.error("--checkpoint requires --file")
+    compressed = False
+    if args.file:
+        with open(args.file, "rb") as f:
+            compressed = decompressor(f.read(6)) is not None
+    if compressed and args.checkpoint:
+        parser.error("--checkpoint requires an uncompressed --file")
+
+    reporter = Reporter(args.format,
+                        MetricsServer(args.serve) if args.serve else None)
+
+    if paths:
+        files_stats(paths, args.workers, args.interval, options,
+                    args.verbose, reporter)
+    elif compressed:
+        with open(args.file, "rb") as f:
+            binary_stats(open_log(f), every, args.interval,
+                         LogStats(**options), reporter)
+    elif args.file:
+        file_stats(args.file, args.workers, every, args.interval, options,
+                   args.checkpoint, args.checkpoint_every, reporter)
+    elif args.binary:
+        binary_stats(open_log(sys.stdin.buffer), every, args.interval,
+                     LogStats(**options), reporter)
+    else:
+        stream_stats(sys.stdin, parse_line, every, args.interval,
+                     LogStats(**options), reporter)
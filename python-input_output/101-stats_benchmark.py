@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""
+101-stats_benchmark
+
+Compare the lines/second of the text, bytes and block parsing paths
+of 101-stats.py on a synthetic log held in memory, after checking
+that they agree on well-formed and degenerate lines.
+
+Usage: ./101-stats_benchmark.py [number_of_lines]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+stats = __import__('101-stats')
+
+
+def make_log(n):
+    """Return n synthetic log lines as bytes."""
+    rng = random.Random(0)
+    lines = []
+    for _ in range(n):
+        lines.append("{}.{}.{}.{} - [2017-02-05 23:31:22.258076] "
+                     "\"GET /projects/260 HTTP/1.1\" {} {}\n".format(
+                         rng.randint(1, 255), rng.randint(1, 255),
+                         rng.randint(1, 255), rng.randint(1, 255),
+                         rng.choice(stats.STATUS_CODES),
+                         rng.randint(1, 1024)))
+    return "".join(lines).encode()
+
+
+DEGENERATE = ("", "2000", "4041", "200", "404 ", " 404", "200 12",
+              "x 200 12", "x 200  12", "x\t200\t12", "x 200 12 ",
+              "x 200 -3", "x 200 1_0", "x 200 +5", "x 200 x", "x 999 12",
+              "x 404\x1c12", "x 200\xa012", "x\xa0200 12", "x 200 \u0663",
+              "x 4041 12", "x 2000 12")
+
+
+def check_parsers(lines):
+    """Exit with an error if the three parsing paths disagree."""
+    for line in lines:
+        text = stats.parse_line(line)
+        binary = stats.parse_line_bytes(line.encode())
+        if text != binary:
+            sys.exit("parsers disagree on {!r}: {} != {}".format(
+                line, text, binary))
+    expected = stats.LogStats()
+    for line in lines:
+        expected.add(*stats.parse_line(line))
+    block = stats.LogStats()
+    block.add_block("\n".join(lines).encode())
+    if block.to_dict() != expected.to_dict():
+        sys.exit("add_block disagrees: {} != {}".format(
+            block.to_dict(), expected.to_dict()))
+
+
+def bench(label, n, run):
+    """Time run() and print its throughput in lines/second."""
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print("{:<28} {:>12,.0f} lines/s".format(label, n / elapsed))
+
+
+def text_path(data):
+    """Parse data the way the default stdin path does."""
+    result = stats.LogStats()
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+    for line in stream:
+        result.add(*stats.parse_line(line))
+
+
+def bytes_path(data):
+    """Parse data the way the --binary stdin path does."""
+    result = stats.LogStats()
+    for line in stats.read_lines(io.BytesIO(data)):
+        result.add(*stats.parse_line_bytes(line))
+
+
+def block_path(data):
+    """Parse data the way the --binary stdin path does by default."""
+    result = stats.LogStats()
+    for block in stats.read_blocks(io.BytesIO(data)):
+        result.add_block(block)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    data = make_log(n)
+    check_parsers(DEGENERATE)
+    check_parsers(data[:1 << 16].decode().splitlines())
+
+    bench("parse, text (str.split)", n, lambda: text_path(data))
+    bench("parse, bytes (rfind)", n, lambda: bytes_path(data))
+    bench("parse, blocks (findall)", n, lambda: block_path(data))
+
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            stats.stream_stats(
+                io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"))
+            text = time.perf_counter() - start
+            start = time.perf_counter()
+            stats.binary_stats(io.BytesIO(data))
+            binary = time.perf_counter() - start
+    print("{:<28} {:>12,.0f} lines/s".format("full run, text", n / text))
+    print("{:<28} {:>12,.0f} lines/s".format("full run, bytes", n / binary))
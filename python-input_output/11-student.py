@@ -1,5 +1,67 @@
 #!/usr/bin/python3
 """Module defining a Student class with serialization/deserialization."""
+from functools import lru_cache
+from operator import itemgetter
+
+
+@lru_cache(maxsize=256)
+def _projection(attrs, layout):
+    """
+    Compile the projection of attrs for instances with a given layout.
+
+    Args:
+        attrs: Tuple of requested attribute names.
+        layout: Tuple of the instance attribute names, in order.
+
+    Returns:
+        Tuple (keys, getter) where keys are the requested names present
+        in layout, in layout order, and getter returns their values as
+        a tuple when applied to the instance __dict__ (names are
+        dictionary keys, so dots in them are not attribute paths).
+        None if attrs are not all strings.
+    """
+    if not all(isinstance(a, str) for a in attrs):
+        return None
+    wanted = frozenset(attrs)
+    keys = tuple(k for k in layout if k in wanted)
+    if len(keys) == 1:
+        get = itemgetter(keys[0])
+        return keys, lambda attributes: (get(attributes),)
+    if not keys:
+        return keys, lambda attributes: ()
+    return keys, itemgetter(*keys)
+
+
+def to_json_all(students, attrs=None):
+    """
+    Retrieve the dictionary representation of many students at once.
+
+    The attrs list is converted once and the compiled projection is
+    shared by all students with the same attributes, instead of being
+    checked again for every student.
+
+    Args:
+        students: Iterable of Student instances.
+        attrs: Optional list of attribute names to retrieve.
+
+    Returns:
+        List of dictionaries, as returned by Student.to_json.
+    """
+    if not (isinstance(attrs, list) and
+            all(isinstance(a, str) for a in attrs)):
+        return [s.__dict__ for s in students]
+    attrs = tuple(attrs)
+    layouts = {}
+    result = []
+    for student in students:
+        attributes = student.__dict__
+        layout = tuple(attributes)
+        compiled = layouts.get(layout)
+        if compiled is None:
+            compiled = layouts[layout] = _projection(attrs, layout)
+        keys, getter = compiled
+        result.append(dict(zip(keys, getter(attributes))))
+    return result
 
 
 class Student:
@@ -22,14 +84,24 @@ class Student:
         """
         Retrieve a dictionary representation of a Student instance.
 
+        The projection for a given attrs list is compiled once and
+        cached, so repeated calls cost O(len(attrs)) instead of
+        O(keys x attrs).
+
         Args:
             attrs: Optional list of attribute names to retrieve.
 
         Returns:
             Dictionary containing the student's attributes.
         """
-        if isinstance(attrs, list) and all(isinstance(a, str) for a in attrs):
-            return {k: v for k, v in self.__dict__.items() if k in attrs}
+        if isinstance(attrs, list):
+            try:
+                compiled = _projection(tuple(attrs), tuple(self.__dict__))
+            except TypeError:
+                compiled = None
+            if compiled is not None:
+                keys, getter = compiled
+                return dict(zip(keys, getter(self.__dict__)))
         return self.__dict__
 
     def reload_from_json(self, json):
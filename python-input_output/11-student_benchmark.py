@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+"""
+11-student_benchmark
+
+Compare the students/second of the original Student.to_json filter,
+the compiled projection and the bulk to_json_all.
+
+Usage: ./11-student_benchmark.py [number_of_students]
+"""
+import sys
+import time
+
+student = __import__('11-student')
+ATTRS = ["first_name", "age"]
+
+
+def original_to_json(self, attrs=None):
+    """The list-scanning to_json the compiled projection replaces."""
+    if isinstance(attrs, list) and all(isinstance(a, str) for a in attrs):
+        return {k: v for k, v in self.__dict__.items() if k in attrs}
+    return self.__dict__
+
+
+def bench(label, n, run):
+    """Time run() and print its throughput in students/second."""
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    print("{:<28} {:>12,.0f} students/s".format(label, n / elapsed))
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    students = [student.Student("John", "Doe", i % 100) for i in range(n)]
+
+    expected = bench("original to_json", n, lambda: [
+        original_to_json(s, ATTRS) for s in students])
+    compiled = bench("compiled to_json", n, lambda: [
+        s.to_json(ATTRS) for s in students])
+    bulk = bench("to_json_all", n, lambda: student.to_json_all(
+        students, ATTRS))
+    assert expected == compiled == bulk
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""Module defining a compact, slotted Student class."""
+
+
+class Student:
+    """
+    A student stored in fixed slots instead of a per-instance __dict__.
+
+    to_json and reload_from_json behave as in 11-student.py. Attributes
+    other than first_name, last_name and age can still be loaded with
+    reload_from_json; they are kept in a dictionary created only for
+    the instances that need one.
+    """
+
+    __slots__ = ("first_name", "last_name", "age", "_extra")
+    _fields = ("first_name", "last_name", "age")
+
+    def __init__(self, first_name, last_name, age):
+        """
+        Initialize a Student instance.
+
+        Args:
+            first_name: The student's first name.
+            last_name: The student's last name.
+            age: The student's age.
+        """
+        self.first_name = first_name
+        self.last_name = last_name
+        self.age = age
+        self._extra = None
+
+    def __getattr__(self, name):
+        """Look up an attribute loaded by reload_from_json."""
+        extra = object.__getattribute__(self, "_extra")
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    def _attributes(self):
+        """Return a new dictionary of the attributes that are set."""
+        attributes = {}
+        for name in self._fields:
+            try:
+                attributes[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        if self._extra:
+            attributes.update(self._extra)
+        return attributes
+
+    def to_json(self, attrs=None):
+        """
+        Retrieve a dictionary representation of a Student instance.
+
+        Unlike 11-student.py, the dictionary is always a new one, as
+        there is no __dict__ to return.
+
+        Args:
+            attrs: Optional list of attribute names to retrieve.
+
+        Returns:
+            Dictionary containing the student's attributes.
+        """
+        attributes = self._attributes()
+        if isinstance(attrs, list) and all(isinstance(a, str) for a in attrs):
+            wanted = frozenset(attrs)
+            return {k: v for k, v in attributes.items() if k in wanted}
+        return attributes
+
+    def reload_from_json(self, json):
+        """
+        Replace all attributes of the Student instance from a dictionary.
+
+        Args:
+            json: Dictionary with attribute names as keys and values.
+        """
+        for key, value in json.items():
+            if key in self._fields:
+                setattr(self, key, value)
+            else:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[key] = value
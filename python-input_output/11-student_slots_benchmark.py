@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+"""
+11-student_slots_benchmark
+
+Compare the memory used per instance by the Student of 11-student.py
+and the slotted Student of 11-student_slots.py, measured with
+tracemalloc over a roster of distinct students.
+
+Usage: ./11-student_slots_benchmark.py [number_of_students]
+"""
+import sys
+import tracemalloc
+
+Student = __import__('11-student').Student
+SlottedStudent = __import__('11-student_slots').Student
+
+
+def bytes_per_student(cls, n):
+    """Return the bytes allocated per instance for a roster of n."""
+    names = [str(i) for i in range(n)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    roster = [cls(name, name, 20) for name in names]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    list_bytes = sys.getsizeof(roster)
+    del roster
+    return (used - list_bytes) / n
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    before = bytes_per_student(Student, n)
+    after = bytes_per_student(SlottedStudent, n)
+    print("{:<28} {:>8.1f} bytes/student".format("Student (__dict__)", before))
+    print("{:<28} {:>8.1f} bytes/student".format("Student (__slots__)", after))
+    print("{:<28} {:>8.1f} MB per 10M students".format(
+        "saved", (before - after) * 10000000 / 1e6))
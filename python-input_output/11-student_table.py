@@ -0,0 +1,192 @@
+#!/usr/bin/python3
+"""Module defining a columnar table of students."""
+from array import array
+from bisect import bisect_left, bisect_right
+
+FIELDS = ("first_name", "last_name", "age")
+COLUMNS = {"first_name": "first_names", "last_name": "last_names",
+           "age": "ages"}
+MAX_CHAR = chr(0x10ffff)
+
+
+class StudentTable:
+    """
+    A roster of students stored as parallel columns.
+
+    first_name and last_name are lists of strings and age is an
+    array('i'). Queries use sorted indexes built on first use (and
+    rebuilt after rows are added), so an age range or a name prefix is
+    found with two binary searches instead of a scan of every student.
+    Query results are arrays of row numbers in ascending order.
+    """
+
+    def __init__(self, students=()):
+        """
+        Initialize a table, optionally from Student instances.
+
+        Args:
+            students: Iterable of objects with first_name, last_name
+                and age attributes.
+        """
+        self.first_names = []
+        self.last_names = []
+        self.ages = array('i')
+        self._indexes = {}
+        for student in students:
+            self.append(student.first_name, student.last_name, student.age)
+
+    def __len__(self):
+        """Return the number of rows."""
+        return len(self.ages)
+
+    def append(self, first_name, last_name, age):
+        """
+        Add a student as a new row.
+
+        Args:
+            first_name: The student's first name.
+            last_name: The student's last name.
+            age: The student's age.
+
+        Returns:
+            The row number of the student.
+        """
+        self.ages.append(age)
+        self.first_names.append(first_name)
+        self.last_names.append(last_name)
+        self._indexes.clear()
+        return len(self.ages) - 1
+
+    def _index(self, name):
+        """
+        Return the sorted index of a column, building it if needed.
+
+        Returns:
+            Tuple (keys, rows): the column values in sorted order and
+            the row number of each of them.
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            column = getattr(self, name)
+            rows = sorted(range(len(column)), key=column.__getitem__)
+            if name == "ages":
+                keys = array('i', (column[i] for i in rows))
+            else:
+                keys = [column[i] for i in rows]
+            index = self._indexes[name] = (keys, array('i', rows))
+        return index
+
+    def _bounds(self, name, low, high):
+        """
+        Locate the values of column name in [low, high] in its index.
+
+        Returns:
+            Tuple (start, stop) of positions in the sorted index; the
+            number of matching rows is stop - start.
+        """
+        keys = self._index(name)[0]
+        return bisect_left(keys, low), bisect_right(keys, high)
+
+    def _lookup(self, name, low, high):
+        """Return the rows whose value in column name is in [low, high]."""
+        start, stop = self._bounds(name, low, high)
+        return array('i', sorted(self._index(name)[1][start:stop]))
+
+    def age_between(self, low, high):
+        """
+        Select the students whose age is between low and high.
+
+        Args:
+            low: Smallest age, included.
+            high: Largest age, included.
+
+        Returns:
+            array('i') of the matching row numbers.
+        """
+        return self._lookup("ages", low, high)
+
+    def first_name_startswith(self, prefix):
+        """
+        Select the students whose first name starts with prefix.
+
+        Args:
+            prefix: Beginning of the first name.
+
+        Returns:
+            array('i') of the matching row numbers.
+        """
+        return self._lookup("first_names", prefix, prefix + MAX_CHAR)
+
+    def last_name_startswith(self, prefix):
+        """
+        Select the students whose last name starts with prefix.
+
+        Args:
+            prefix: Beginning of the last name.
+
+        Returns:
+            array('i') of the matching row numbers.
+        """
+        return self._lookup("last_names", prefix, prefix + MAX_CHAR)
+
+    def where(self, age=None, first_name=None, last_name=None):
+        """
+        Select the students matching every given predicate.
+
+        The number of rows matching each predicate is known from two
+        binary searches in its index, so only the rows of the most
+        selective one are collected; the others are checked on those
+        rows only, and the survivors are sorted.
+
+        Args:
+            age: Optional (low, high) age range, both included.
+            first_name: Optional first name prefix.
+            last_name: Optional last name prefix.
+
+        Returns:
+            array('i') of the matching row numbers.
+        """
+        ranges = []
+        if age is not None:
+            ranges.append(("ages", age[0], age[1]))
+        if first_name is not None:
+            ranges.append(("first_names", first_name,
+                           first_name + MAX_CHAR))
+        if last_name is not None:
+            ranges.append(("last_names", last_name, last_name + MAX_CHAR))
+        if not ranges:
+            return array('i', range(len(self)))
+
+        bounds = [self._bounds(*search) for search in ranges]
+        best = min(range(len(ranges)),
+                   key=lambda i: bounds[i][1] - bounds[i][0])
+        start, stop = bounds[best]
+        rows = self._index(ranges[best][0])[1][start:stop]
+        for i, (name, low, high) in enumerate(ranges):
+            if i != best and rows:
+                column = getattr(self, name)
+                rows = [row for row in rows if low <= column[row] <= high]
+        return array('i', sorted(rows))
+
+    def to_json(self, rows=None, attrs=None):
+        """
+        Yield the dictionary representation of students one at a time.
+
+        Each dictionary is the one Student.to_json(attrs) returns, so
+        the result can be streamed to save_iter_to_json_file.
+
+        Args:
+            rows: Optional row numbers to export (default: all rows).
+            attrs: Optional list of attribute names to retrieve.
+
+        Yields:
+            Dictionary containing each student's attributes.
+        """
+        fields = FIELDS
+        if isinstance(attrs, list) and all(isinstance(a, str) for a in attrs):
+            fields = tuple(f for f in FIELDS if f in attrs)
+        columns = [getattr(self, COLUMNS[name]) for name in fields]
+        if rows is None:
+            rows = range(len(self))
+        for i in rows:
+            yield {name: column[i] for name, column in zip(fields, columns)}
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+11-student_table_benchmark
+
+Compare filtering a list of Student objects with a comprehension and
+querying the same roster held in a StudentTable.
+
+Usage: ./11-student_table_benchmark.py [number_of_students]
+"""
+import random
+import sys
+import time
+
+Student = __import__('11-student').Student
+StudentTable = __import__('11-student_table').StudentTable
+
+
+def bench(label, run):
+    """Time run() and print its duration in milliseconds."""
+    start = time.perf_counter()
+    result = run()
+    print("{:<32} {:>10.1f} ms".format(
+        label, (time.perf_counter() - start) * 1000))
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    students = [Student("First{}".format(rng.randint(0, 99999)),
+                        "Last{}".format(rng.randint(0, 99999)),
+                        rng.randint(18, 99)) for _ in range(n)]
+    table = bench("build table", lambda: StudentTable(students))
+    bench("build indexes", lambda: table.where((0, 0), "", ""))
+
+    expected = bench("list, age 30-31", lambda: [
+        s.to_json() for s in students if 30 <= s.age <= 31])
+    rows = bench("table, age 30-31", lambda: list(table.to_json(
+        table.age_between(30, 31))))
+    assert rows == expected
+
+    expected = bench("list, first name prefix", lambda: [
+        s.to_json() for s in students if s.first_name.startswith("First123")])
+    rows = bench("table, first name prefix", lambda: list(table.to_json(
+        table.first_name_startswith("First123"))))
+    assert rows == expected
+
+    expected = bench("list, age and last name", lambda: [
+        s.to_json() for s in students
+        if 30 <= s.age <= 40 and s.last_name.startswith("Last12")])
+    rows = bench("table, age and last name", lambda: list(table.to_json(
+        table.where((30, 40), last_name="Last12"))))
+    assert rows == expected
@@ -1,31 +1,256 @@
 #!/usr/bin/python3
 """Module for generating Pascal's triangle."""
+import sys
+import threading
+from array import array
 
+MAX_MODULUS = 1 << 62
+CACHE_BYTES = 64 << 20
 
-def pascal_triangle(n):
+
+def pascal_triangle(n, modulus=None):
     """
     Generate Pascal's triangle of n rows.
 
     Args:
         n: Number of rows to generate.
+        modulus: Optional modulus; if given, every entry is reduced
+            modulo it and rows are compact array('q') buffers.
 
     Returns:
-        List of lists representing Pascal's triangle.
-        Empty list if n <= 0.
+        List of lists (of arrays in modular mode) representing
+        Pascal's triangle. Empty list if n <= 0.
+    """
+    if modulus is not None:
+        return [array('q', row) for row in pascal_rows_mod(n, modulus)]
+    return list(pascal_rows(n))
+
+
+def pascal_rows(n):
+    """
+    Yield the first n rows of Pascal's triangle one at a time.
+
+    Only the previous row is kept, so memory is O(n) instead of the
+    O(n²) needed to hold the whole triangle.
+
+    Args:
+        n: Number of rows to generate.
+
+    Yields:
+        Each row as a new list, starting with [1].
     """
     if n <= 0:
+        return
+
+    row = [1]
+    yield row
+
+    for i in range(1, n):
+        row = next_row(row)
+        yield row
+
+
+def next_row(prev_row):
+    """
+    Compute the row of Pascal's triangle following prev_row.
+
+    Args:
+        prev_row: A row of the triangle (any sequence).
+
+    Returns:
+        The next row as a new list.
+    """
+    row = [1]
+
+    for j in range(1, len(prev_row)):
+        row.append(prev_row[j - 1] + prev_row[j])
+
+    row.append(1)
+    return row
+
+
+def pascal_row(k):
+    """
+    Compute row k of Pascal's triangle directly.
+
+    Uses C(k, j + 1) = C(k, j) * (k - j) / (j + 1) for the first half
+    of the row and mirrors it, so only O(k) operations are needed.
+
+    Args:
+        k: Index of the row, starting at 0 for [1].
+
+    Returns:
+        The row as a list of k + 1 integers.
+        Empty list if k < 0.
+    """
+    if k < 0:
         return []
 
-    triangle = [[1]]
+    row = [1] * (k + 1)
+    for j in range(k // 2):
+        row[j + 1] = row[k - j - 1] = row[j] * (k - j) // (j + 1)
+
+    return row
+
+
+def pascal_rows_mod(n, modulus):
+    """
+    Yield the first n rows of Pascal's triangle modulo modulus.
+
+    A single array('q') of machine-width integers is updated in place
+    from right to left, so each row costs 8 bytes per entry and no
+    new row is allocated. The same buffer is yielded every time: copy
+    it (e.g. array('q', row)) to keep a row.
+
+    Args:
+        n: Number of rows to generate.
+        modulus: Integer between 1 and 2**62, so that the sum of two
+            reduced entries still fits in a signed 64-bit integer.
+
+    Yields:
+        The current row as an array('q').
+
+    Raises:
+        TypeError: If modulus is not an integer.
+        ValueError: If modulus is out of range.
+    """
+    if not isinstance(modulus, int):
+        raise TypeError("modulus must be an integer")
+    if modulus < 1 or modulus > MAX_MODULUS:
+        raise ValueError("modulus must be between 1 and 2**62")
+    if n <= 0:
+        return
+
+    one = 1 % modulus
+    row = array('q', [one])
+    yield row
 
     for i in range(1, n):
-        prev_row = triangle[-1]
-        new_row = [1]
+        row.append(one)
+        for j in range(i - 1, 0, -1):
+            value = row[j] + row[j - 1]
+            row[j] = value - modulus if value >= modulus else value
+        yield row
+
+
+class PascalCache:
+    """
+    Shared cache of the largest Pascal's triangle computed so far.
+
+    Rows are stored as tuples and served as read-only tuples of rows,
+    so smaller requests cost O(n) references and larger ones only
+    compute the missing rows. The cache holds a prefix of the triangle
+    whose approximate size stays within max_bytes; rows beyond it are
+    computed on demand from the last cached row and not kept.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes: Approximate memory cap of the cached rows.
+        """
+        self.max_bytes = max_bytes
+        self._rows = []
+        self._row_bytes = []
+        self._bytes = 0
+        self._full = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of cached rows."""
+        return len(self._rows)
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by the cached rows."""
+        return self._bytes
+
+    def triangle(self, n):
+        """
+        Return the first n rows of Pascal's triangle.
 
-        for j in range(1, len(prev_row)):
-            new_row.append(prev_row[j - 1] + prev_row[j])
+        Args:
+            n: Number of rows to return.
 
-        new_row.append(1)
-        triangle.append(new_row)
+        Returns:
+            Tuple of row tuples. Empty tuple if n <= 0.
+        """
+        if n <= 0:
+            return ()
 
-    return triangle
+        with self._lock:
+            overflow = self._extend(n)
+            rows = tuple(self._rows[:n])
+
+        if len(rows) < n:
+            extra = [overflow] if overflow else []
+            row = extra[-1] if extra else rows[-1] if rows else None
+            for i in range(len(rows) + len(extra), n):
+                row = (1,) if row is None else tuple(next_row(row))
+                extra.append(row)
+            rows += tuple(extra)
+        return rows
+
+    def _extend(self, n):
+        """
+        Cache rows up to n while they fit in max_bytes.
+
+        Rows only grow, so once a row has not fit the cache is marked
+        full and no further row is computed under the lock until the
+        cap changes.
+
+        Returns:
+            The first row that did not fit, if one was computed, so
+            the caller can reuse it. None otherwise.
+        """
+        rows = self._rows
+        while len(rows) < n and not self._full:
+            row = tuple(next_row(rows[-1])) if rows else (1,)
+            size = sys.getsizeof(row) + sum(sys.getsizeof(x) for x in row)
+            if self._bytes + size > self.max_bytes:
+                self._full = True
+                return row
+            rows.append(row)
+            self._row_bytes.append(size)
+            self._bytes += size
+        return None
+
+    def resize(self, max_bytes):
+        """
+        Change the memory cap, evicting the largest rows if needed.
+
+        Args:
+            max_bytes: New approximate memory cap.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._full = False
+            while self._bytes > max_bytes:
+                self._rows.pop()
+                self._bytes -= self._row_bytes.pop()
+
+    def clear(self):
+        """Drop every cached row, keeping the memory cap."""
+        with self._lock:
+            self._rows = []
+            self._row_bytes = []
+            self._bytes = 0
+            self._full = False
+
+
+pascal_cache = PascalCache()
+
+
+def cached_pascal_triangle(n):
+    """
+    Return Pascal's triangle of n rows from the process-wide cache.
+
+    Args:
+        n: Number of rows to generate.
+
+    Returns:
+        Tuple of row tuples (read-only). Empty tuple if n <= 0.
+    """
+    return pascal_cache.triangle(n)
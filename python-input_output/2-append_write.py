@@ -1,5 +1,8 @@
 #!/usr/bin/python3
 """Module for appending to files."""
+import atexit
+import os
+import threading
 
 
 def append_write(filename="", text=""):
@@ -15,3 +18,98 @@ def append_write(filename="", text=""):
     """
     with open(filename, mode="a", encoding="utf-8") as f:
         return f.write(text)
+
+
+class Appender:
+    """
+    Long-lived appender that batches writes to a text file (UTF8).
+
+    The file stays open, appended strings are collected in memory and
+    written together once max_chars characters are pending or
+    max_delay seconds have passed since the first pending write. All
+    methods are safe to call from several threads. An appender that
+    is still open when the interpreter exits is closed by an atexit
+    hook, so pending text is not lost with the daemon flush timer.
+    """
+
+    def __init__(self, filename="", max_chars=1 << 16, max_delay=1.0,
+                 fsync=False):
+        """
+        Open filename for appending.
+
+        Args:
+            filename: The name of the file to append to.
+            max_chars: Pending characters that trigger a flush.
+            max_delay: Seconds after which pending text is flushed
+                (None to flush on size, flush() and close() only).
+            fsync: Whether to os.fsync the file after each flush.
+        """
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self._file = open(filename, mode="a", encoding="utf-8")
+        self._pending = []
+        self._pending_chars = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.close)
+
+    def append_write(self, text=""):
+        """
+        Append a string to the file, possibly later.
+
+        Args:
+            text: The text to append.
+
+        Returns:
+            The number of characters added.
+        """
+        with self._lock:
+            if self._file is None:
+                raise ValueError("I/O operation on closed Appender")
+            self._pending.append(text)
+            self._pending_chars += len(text)
+            if self._pending_chars >= self.max_chars:
+                self._flush()
+            elif self._timer is None and self.max_delay is not None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return len(text)
+
+    def flush(self):
+        """Write all pending text to the file."""
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+
+    def _flush(self):
+        """Write pending text; the lock must be held."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        self._file.write("".join(self._pending))
+        self._pending = []
+        self._pending_chars = 0
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Flush pending text and close the file."""
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+                self._file.close()
+                self._file = None
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        """Return the appender for use in a with statement."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the appender."""
+        self.close()
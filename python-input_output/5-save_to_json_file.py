@@ -2,6 +2,8 @@
 """Module for saving objects to JSON files."""
 import json
 
+BUFFER_SIZE = 1 << 20
+
 
 def save_to_json_file(my_obj, filename):
     """
@@ -13,3 +15,44 @@ def save_to_json_file(my_obj, filename):
     """
     with open(filename, mode="w", encoding="utf-8") as f:
         json.dump(my_obj, f)
+
+
+def save_iter_to_json_file(iterable, filename, lines=False,
+                           buffer_size=BUFFER_SIZE):
+    """
+    Write the items of any iterable to a JSON file incrementally.
+
+    Items are encoded one at a time and written through a large file
+    buffer, so memory stays constant however many items there are.
+    For a list, the JSON array written is byte for byte the output of
+    save_to_json_file.
+
+    Args:
+        iterable: The items to save (a list, generator, ...).
+        filename: The name of the file to write to.
+        lines: If True, write JSON Lines (one item per line) instead
+            of a single JSON array.
+        buffer_size: Size in bytes of the write buffer.
+
+    Returns:
+        The number of items written.
+    """
+    encode = json.JSONEncoder().encode
+    count = 0
+    with open(filename, mode="w", encoding="utf-8",
+              buffering=buffer_size) as f:
+        write = f.write
+        if lines:
+            for item in iterable:
+                write(encode(item))
+                write("\n")
+                count += 1
+        else:
+            write("[")
+            for item in iterable:
+                if count:
+                    write(", ")
+                write(encode(item))
+                count += 1
+            write("]")
+    return count
@@ -2,6 +2,11 @@
 """Module for loading objects from JSON files."""
 import json
 
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+NUMBER_TAIL = "0123456789.eE+-"
+LONGEST_TOKEN = len("-Infinity")
+
 
 def load_from_json_file(filename):
     """
@@ -15,3 +20,130 @@ def load_from_json_file(filename):
     """
     with open(filename, encoding="utf-8") as f:
         return json.load(f)
+
+
+def iter_json_file(filename, chunk_size=CHUNK_SIZE):
+    """
+    Yield the top-level elements of a JSON file one at a time.
+
+    The file is read in chunks and each element is decoded with
+    json.JSONDecoder.raw_decode as soon as it is complete, so peak
+    memory is bounded by the largest single element plus a chunk.
+
+    Args:
+        filename: The name of the JSON file to load from.
+        chunk_size: Number of characters read at a time.
+
+    Yields:
+        Each element of a top-level array, each (key, value) pair of a
+        top-level object, or the value itself for any other document.
+
+    Raises:
+        json.JSONDecodeError: If the file is not valid JSON.
+    """
+    with open(filename, encoding="utf-8") as f:
+        yield from _JSONStream(f, chunk_size).items()
+
+
+class _JSONStream:
+    """Incremental reader over the text of one JSON document."""
+
+    def __init__(self, f, chunk_size):
+        """Read from text file f, chunk_size characters at a time."""
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        """Drop consumed text and read size more characters."""
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+        self.buf += chunk
+
+    def _peek(self):
+        """Skip whitespace and return the next character, or ""."""
+        while True:
+            buf = self.buf
+            while self.pos < len(buf) and buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill(self.chunk_size)
+
+    def _expect(self, chars):
+        """Consume and return the next character if it is in chars."""
+        char = self._peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                "Expecting one of {!r}".format(chars), self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def _value(self):
+        """
+        Decode the next value, reading more text until it is whole.
+
+        A value is only accepted once a character that cannot continue
+        a number follows it, so numbers split across chunks are never
+        decoded from their first part. More text is only read when the
+        error could come from the value being cut at the end of the
+        buffer: inside a string, or within the last LONGEST_TOKEN
+        characters. Any other syntax error is raised at once instead
+        of reading the rest of the file.
+        """
+        self._peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as error:
+                if self.eof or not self._truncated(error):
+                    raise
+            else:
+                if self.eof or (end < len(self.buf) and
+                                self.buf[end] not in NUMBER_TAIL):
+                    self.pos = end
+                    return value
+            self._fill(size)
+            size *= 2
+
+    def _truncated(self, error):
+        """Return whether more text could fix the decoding error."""
+        return (error.msg.startswith("Unterminated string") or
+                error.pos + LONGEST_TOKEN > len(self.buf))
+
+    def items(self):
+        """Yield the top-level elements of the document."""
+        char = self._peek()
+        if char == "[":
+            self.pos += 1
+            if self._peek() == "]":
+                self.pos += 1
+            else:
+                while True:
+                    yield self._value()
+                    if self._expect(",]") == "]":
+                        break
+        elif char == "{":
+            self.pos += 1
+            if self._peek() == "}":
+                self.pos += 1
+            else:
+                while True:
+                    if self._peek() != '"':
+                        self._expect('"')
+                    key = self._value()
+                    self._expect(":")
+                    yield key, self._value()
+                    if self._expect(",}") == "}":
+                        break
+        else:
+            yield self._value()
+        if self._peek():
+            raise json.JSONDecodeError("Extra data", self.buf, self.pos)
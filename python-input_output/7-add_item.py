@@ -1,15 +1,117 @@
 #!/usr/bin/python3
-"""Script that adds arguments to a Python list and saves to a file."""
+"""Script that adds arguments to a Python list and saves to a file.
+
+Each run appends its arguments to add_item.jsonl, one JSON value per
+line, instead of rewriting the whole list. Run with --compact to fold
+that log into the JSON array stored in add_item.json. A leading --
+ends the options, so "./7-add_item.py -- --compact" adds the string
+"--compact" itself.
+"""
+import itertools
+import json
+import os
 import sys
-save_to_json_file = __import__('5-save_to_json_file').save_to_json_file
-load_from_json_file = __import__('6-load_from_json_file').load_from_json_file
+save_iter_to_json_file = \
+    __import__('5-save_to_json_file').save_iter_to_json_file
+iter_json_file = __import__('6-load_from_json_file').iter_json_file
 
 filename = "add_item.json"
+log_filename = "add_item.jsonl"
+
+
+def append_items(items, log=log_filename):
+    """
+    Append items to the JSON Lines log in a single write.
+
+    Args:
+        items: The values to add.
+        log: The name of the log file.
+    """
+    if not items:
+        return
+    with open(log, mode="a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(item) + "\n" for item in items))
+
+
+def iter_items(base=filename, log=log_filename):
+    """
+    Yield the items of the list, reconstructed from its files.
+
+    The array is streamed element by element, so memory does not grow
+    with the size of the list. If a compaction was interrupted after
+    its new array was complete, that array already holds the renamed
+    log and is read in its place. If that compaction finishes before
+    the new array is opened, the published base array is read instead.
+
+    Args:
+        base: The compacted JSON array file.
+        log: The JSON Lines log appended to since the last compaction.
+
+    Yields:
+        The items of the base array, then those of the log in order.
+    """
+    try:
+        yield from iter_json_file(base + ".new")
+    except FileNotFoundError:
+        yield from _iter_array(base)
+        yield from _iter_log(log + ".compacting")
+    yield from _iter_log(log)
+
+
+def _iter_array(path):
+    """Yield the elements of a JSON array file, if it exists."""
+    try:
+        yield from iter_json_file(path)
+    except FileNotFoundError:
+        pass
+
+
+def _iter_log(path):
+    """Yield the values of a JSON Lines file, if it exists."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except FileNotFoundError:
+        pass
+
+
+def compact(base=filename, log=log_filename):
+    """
+    Fold the JSON Lines log into the JSON array file.
+
+    The log is first renamed aside so concurrent runs keep appending
+    to a fresh log. The base array and the renamed log are then
+    streamed into base + ".tmp", which is renamed to base + ".new"
+    once complete. Only then is the renamed log removed and the new
+    array published over the base file. A run interrupted at any
+    point can be resumed by running compact again, and no item is
+    ever folded in twice.
+
+    Args:
+        base: The compacted JSON array file.
+        log: The JSON Lines log.
+    """
+    new = base + ".new"
+    pending = log + ".compacting"
+    if not os.path.exists(new):
+        if os.path.exists(log) and not os.path.exists(pending):
+            os.replace(log, pending)
+        tmp = base + ".tmp"
+        save_iter_to_json_file(
+            itertools.chain(_iter_array(base), _iter_log(pending)), tmp)
+        os.replace(tmp, new)
+    if os.path.exists(pending):
+        os.remove(pending)
+    os.replace(new, base)
 
-try:
-    my_list = load_from_json_file(filename)
-except FileNotFoundError:
-    my_list = []
 
-my_list.extend(sys.argv[1:])
-save_to_json_file(my_list, filename)
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args == ["--compact"]:
+        compact()
+    else:
+        if args[:1] == ["--"]:
+            del args[0]
+        append_items(args)
@@ -1,6 +1,15 @@
 #!/usr/bin/env python3
 """Module for basic serialization and deserialization using JSON."""
+import importlib.util
 import json
+import os
+
+_spec = importlib.util.spec_from_file_location(
+    "load_from_json_file",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                 "python-input_output", "6-load_from_json_file.py"))
+_json_file = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_json_file)
 
 
 def serialize_and_save_to_file(data, filename):
@@ -27,3 +36,23 @@ def load_and_deserialize(filename):
     """
     with open(filename, encoding="utf-8") as f:
         return json.load(f)
+
+
+def iter_and_deserialize(filename, chunk_size=_json_file.CHUNK_SIZE):
+    """
+    Load and deserialize a JSON file one top-level element at a time.
+
+    Unlike load_and_deserialize, the file is never held in memory as a
+    whole. This is iter_json_file from
+    python-input_output/6-load_from_json_file.py.
+
+    Args:
+        filename: The filename of the input JSON file.
+        chunk_size: Number of characters read at a time.
+
+    Returns:
+        An iterator over each element of a top-level array, each
+        (key, value) pair of a top-level object, or the value itself
+        for any other document.
+    """
+    return _json_file.iter_json_file(filename, chunk_size)